@@ -0,0 +1,162 @@
+import random
+import statistics
+import sys
+
+import degrees
+from graph import SearchStats, compile_graph
+from landmarks import build_landmarks
+
+# Seed for synthetic data and query pairs, so runs are comparable
+SEED = 50
+
+# Number of (source, target) pairs timed per data set
+PAIRS = 20
+
+# Searches compared, in the order they are reported
+SEARCHES = ["bidirectional", "breadth-first", "landmark", "frontier"]
+
+# Synthetic data sets as (name, people, movies), sized like the CS50
+# "small" directory and a slice of "large"
+SCALES = [
+    ("synthetic-small", 2000, 1000),
+    ("synthetic-large", 200000, 100000),
+]
+
+# Number of stars per synthetic movie, as in stars.csv
+STARS = 4
+
+# Chance that a synthetic role goes to someone who already has one,
+# which gives a few actors most of the roles like in real data
+REPEAT = 0.5
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python benchmark.py [directory]")
+
+    if len(sys.argv) == 2:
+        print(f"Loading {sys.argv[1]}...")
+        degrees.load_data(sys.argv[1])
+        degrees.use_landmarks(sys.argv[1])
+        report(sys.argv[1], benchmark(SEARCHES))
+        return
+
+    for name, people_count, movie_count in SCALES:
+        print(f"Generating {name}...")
+        use_data(*synthetic_data(people_count, movie_count))
+        report(name, benchmark(SEARCHES))
+
+
+def synthetic_data(people_count, movie_count, seed=SEED):
+    """
+    Return (people, movies) dictionaries shaped like those built by
+    degrees.load_data, and a list of (person, movie) index pairs with
+    STARS random stars per movie.
+    """
+    rng = random.Random(seed)
+    people = {
+        str(i): {
+            "name": f"Person {i}",
+            "birth": str(1900 + rng.randrange(100))
+        }
+        for i in range(people_count)
+    }
+    movies = {}
+    pairs = []
+    roles = []
+    for i in range(movie_count):
+        stars = set()
+        while len(stars) < min(STARS, people_count):
+            if roles and rng.random() < REPEAT:
+                stars.add(rng.choice(roles))
+            else:
+                stars.add(str(rng.randrange(people_count)))
+        movies[str(i)] = {
+            "title": f"Movie {i}",
+            "year": str(1950 + rng.randrange(70))
+        }
+        for person_id in stars:
+            pairs.append((int(person_id), i))
+            roles.append(person_id)
+    return people, movies, pairs
+
+
+def use_data(people, movies, stars):
+    """
+    Replace the data loaded in degrees with `people` and `movies`, and
+    compile the graph and landmark index for them with `stars`, a list
+    of (person, movie) index pairs.
+    """
+    degrees.names.clear()
+    degrees.people.clear()
+    degrees.movies.clear()
+    degrees.people.update(people)
+    degrees.movies.update(movies)
+    for person_id, person in people.items():
+        degrees.names.setdefault(person["name"].lower(), set()).add(person_id)
+    degrees.graph = compile_graph(list(people), list(movies), stars)
+    degrees.landmarks = build_landmarks(degrees.graph)
+
+
+def query_pairs(count=PAIRS, seed=SEED):
+    """
+    Return `count` (source, target) person id pairs, drawn the same way
+    every run from people who starred in at least one movie.
+    """
+    rng = random.Random(seed)
+    graph = degrees.graph
+    actors = sorted(graph.person_ids[p] for p in range(len(graph))
+                    if graph.offsets[p + 1] > graph.offsets[p])
+    return [(rng.choice(actors), rng.choice(actors)) for _ in range(count)]
+
+
+def benchmark(searches, pairs=None):
+    """
+    Run every search in `searches` on every pair and return a dictionary
+    mapping each search to its list of (path length, SearchStats).
+
+    Path lengths are None for unconnected pairs.
+    """
+    pairs = query_pairs() if pairs is None else pairs
+    results = {}
+    for search in searches:
+        results[search] = []
+        for source, target in pairs:
+            stats = SearchStats()
+            path = degrees.shortest_path(source, target, search, stats)
+            results[search].append(
+                (None if path is None else len(path), stats)
+            )
+    return results
+
+
+def report(name, results):
+    """
+    Print one line of summary statistics per search, flagging searches
+    whose path lengths disagree with the first one.
+    """
+    print(f"{name}: {len(degrees.people)} people, "
+          f"{len(degrees.graph.neighbors)} edges")
+    print(f"  {'search':<14}{'mean ms':>10}{'median ms':>11}{'max ms':>10}"
+          f"{'expanded':>11}{'peak':>9}{'sets':>9}  check")
+    reference = None
+    for search, runs in results.items():
+        lengths = [length for length, _ in runs]
+        if reference is None:
+            reference = lengths
+        milliseconds = [stats.seconds * 1000 for _, stats in runs]
+        disagree = sum(a != b for a, b in zip(lengths, reference))
+        print(
+            f"  {search:<14}"
+            f"{statistics.mean(milliseconds):>10.2f}"
+            f"{statistics.median(milliseconds):>11.2f}"
+            f"{max(milliseconds):>10.2f}"
+            f"{statistics.mean(s.expanded for _, s in runs):>11.0f}"
+            f"{max(s.frontier_peak for _, s in runs):>9}"
+            f"{statistics.mean(s.neighbor_sets for _, s in runs):>9.0f}"
+            f"  {'ok' if not disagree else f'{disagree} differ'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
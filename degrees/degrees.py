@@ -1,30 +1,74 @@
 import csv
+import io
+import math
+import os
 import sys
+import time
+from array import array
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import SEARCHES, compile_graph
+from landmarks import landmark_index, landmark_search, update_landmarks
+from nameindex import build_name_index
+from snapshot import load_snapshot, save_snapshot
+from util import Node, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
+# Maps person_ids to a dictionary of: name, birth
 people = {}
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
+# Maps movie_ids to a dictionary of: title, year
 movies = {}
 
+# Co-star graph compiled by load_data; who starred in what is only kept
+# here, as each person's edges to themselves
+graph = None
+
+# Optional landmark distance index over graph, see use_landmarks
+landmarks = None
+
+# Prefix and fuzzy index over people's names built by load_data
+name_index = None
+
+# Maps each loaded CSV file's path to the number of bytes read from it,
+# so that update_data only reads rows appended since
+loaded = {}
+
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
 
 def load_data(directory):
     """
     Load data from CSV files into memory.
+
+    Uses the binary snapshot in `directory` when it is newer than the
+    CSV files, and writes a fresh one after parsing them otherwise.
     """
+    global graph, name_index
+
+    # Rows appended while loading are read again by update_data, which
+    # ignores rows it has already applied
+    for filename in SOURCES:
+        path = os.path.join(directory, filename)
+        loaded[path] = os.path.getsize(path)
+
+    snapshot = load_snapshot(directory)
+    if snapshot is not None:
+        (snapshot_names, snapshot_people, snapshot_movies,
+         graph, name_index) = snapshot
+        names.update(snapshot_names)
+        people.update(snapshot_people)
+        movies.update(snapshot_movies)
+        return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             people[row["id"]] = {
                 "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
+                "birth": row["birth"]
             }
             if row["name"].lower() not in names:
                 names[row["name"].lower()] = {row["id"]}
@@ -37,19 +81,126 @@ def load_data(directory):
         for row in reader:
             movies[row["id"]] = {
                 "title": row["title"],
-                "year": row["year"],
-                "stars": set()
+                "year": row["year"]
             }
 
-    # Load stars
+    # Load stars as (person, movie) index pairs
+    person_ids = list(people)
+    movie_ids = list(movies)
+    person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+    movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+    stars = set()
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+            person = person_index.get(row["person_id"])
+            movie = movie_index.get(row["movie_id"])
+            if person is not None and movie is not None:
+                stars.add((person, movie))
+    del person_index, movie_index
+
+    # Number of movies of each person, to rank name matches by
+    weights = array("i", [0]) * len(person_ids)
+    for person, _ in stars:
+        weights[person] += 1
+
+    # Compile the co-star graph used for searching, and index names
+    graph = compile_graph(person_ids, movie_ids, stars)
+    del stars
+    name_index = build_name_index(people, weights)
+    save_snapshot(directory, names, people, movies, graph, name_index)
+
+
+def update_data(directory):
+    """
+    Apply rows appended to the CSV files in `directory` since they were
+    loaded, as apply_delta does, and return the same set of person_ids.
+
+    Incomplete last lines are left for the next call.
+    """
+    rows = [read_appended(os.path.join(directory, f)) for f in SOURCES]
+    return apply_delta(*rows)
+
+
+def read_appended(path):
+    """
+    Return the rows appended to CSV file `path` since it was last read,
+    as dictionaries keyed by its header.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = max(loaded.get(path, 0), len(header))
+        f.seek(start)
+        data = f.read()
+    # Only consume complete lines
+    data = data[:data.rfind(b"\n") + 1]
+    loaded[path] = start + len(data)
+
+    fieldnames = next(csv.reader([header.decode("utf-8")]))
+    return list(csv.DictReader(
+        io.StringIO(data.decode("utf-8")), fieldnames=fieldnames
+    ))
+
+
+def apply_delta(people_rows, movie_rows, star_rows):
+    """
+    Add rows shaped like those of people.csv, movies.csv and stars.csv
+    to `names`, `people`, `movies`, the compiled graph and the landmark
+    index, skipping rows that are already loaded.
+
+    Returns the set of previously loaded person_ids that gained
+    co-stars; only paths near them can have become shorter.
+    """
+    global landmarks
+
+    new_people = set()
+    for row in people_rows:
+        if row["id"] in people:
+            continue
+        people[row["id"]] = {
+            "name": row["name"],
+            "birth": row["birth"]
+        }
+        names.setdefault(row["name"].lower(), set()).add(row["id"])
+        name_index.add(row["id"], row["name"], row["birth"])
+        graph.add_person(row["id"])
+        new_people.add(row["id"])
+
+    for row in movie_rows:
+        if row["id"] in movies:
+            continue
+        movies[row["id"]] = {
+            "title": row["title"],
+            "year": row["year"]
+        }
+        graph.add_movie(row["id"])
+
+    touched = set()
+    edges = []
+    for row in star_rows:
+        person_id = row["person_id"]
+        movie_id = row["movie_id"]
+        if person_id not in people or movie_id not in movies:
+            continue
+        person = graph.person_index[person_id]
+        movie = graph.movie_number(movie_id)
+        if person in graph.stars(movie):
+            continue
+
+        # Connect the person to everyone in the movie, themselves included
+        cast = list(graph.stars(movie))
+        cast.append(person)
+        for star in cast:
+            graph.add_edge(person, star, movie)
+            edges.append((person, star))
+            if star != person:
+                graph.add_edge(star, person, movie)
+                edges.append((star, person))
+            touched.update({person_id, graph.person_ids[star]})
+
+    if landmarks is not None and (edges or new_people):
+        landmarks = update_landmarks(landmarks, graph, edges)
+    return touched - new_people
 
 
 def main():
@@ -84,52 +235,114 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, search="bidirectional", stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    `search` selects the algorithm: "bidirectional" (default),
+    "breadth-first", "landmark" (A* guided by the landmark index,
+    which use_landmarks must have loaded), or "frontier" (the original
+    Node and QueueFrontier search, kept as a baseline). Whenever the
+    index is loaded, pairs it proves unconnected are answered without
+    searching. A SearchStats passed as `stats` records the work done.
+
     If no possible path, returns None.
     """
-    # Find a solution to problem (if it exists)
-    # Keep track of number of states explored.
-    # not needed for this problem num_explored = 0
-    # Initialize frontier to just the starting position.
+    if search not in SEARCHES and search not in ("landmark", "frontier"):
+        raise ValueError(f"unknown search: {search}")
+    if search == "landmark" and landmarks is None:
+        raise ValueError("landmark search needs use_landmarks first")
+
+    started = time.perf_counter()
+    if search == "frontier":
+        path = frontier_search(source, target, stats)
+    else:
+        path = indexed_search(source, target, search, stats)
+    if stats is not None:
+        stats.seconds = time.perf_counter() - started
+    return path
+
+
+def indexed_search(source, target, search, stats):
+    """
+    Returns the result of shortest_path for a search that runs on the
+    dense indices of the compiled graph.
+    """
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    if search == "landmark":
+        path = landmark_search(graph, landmarks, source, target, stats)
+    elif (landmarks is not None and
+            landmarks.lower_bound(source, target) == math.inf):
+        path = None
+    else:
+        path = SEARCHES[search](graph, source, target, stats)
+
+    if path is None:
+        return None
+    return [
+        (graph.movie_ids[movie], graph.person_ids[person])
+        for movie, person in path
+    ]
+
+
+def frontier_search(source, target, stats=None):
+    """
+    Returns the result of shortest_path using Node objects in a
+    QueueFrontier, expanded through neighbors_for_person.
+    """
+    if source == target:
+        return []
+
     start = Node(state=source, parent=None, action=None)
-    # Use Breadth-first
     frontier = QueueFrontier()
     frontier.add(start)
-    # Initialize an empty explored set.
     explored = set()
-    # Keep looping until solution is found.
-    while True:
-        # If nothing left in the frontier, then no path
-        if frontier.empty():
-            return None
-        # Choose a node from the frontier and increment explored counter
+    while not frontier.empty():
+        if stats is not None:
+            stats.expand(1, len(frontier.frontier))
+            stats.neighbor_sets += 1
         node = frontier.remove()
-        # not needed for this problem num_explored += 1
-        # Add neighbors to frontier
+        explored.add(node.state)
         for action, state in neighbors_for_person(node.state):
-            if not frontier.contains_state(state) and state not in explored:
-                child = Node(state=state, parent=node, action=action)
-                # Improve the efficiency of search by checking for a goal as nodes are added to the frontier
-                # if detected a goal node, no need to add it to the frontier, simply return the solution
-                if node.state == target:
-                    # If node is the goal, then we have a solution
-                    path = []
-                    # Follow parent nodes to find a solution
-                    while node.parent is not None:
-                        path.append((node.action, node.state))
-                        node = node.parent
-                    path.reverse()
-                    solution = path
-                    return solution
-                else:
-                    # Else, add to the frontier
-                    frontier.add(child)
-                    # Mark node as explored
-                    explored.add(node.state)
+            if frontier.contains_state(state) or state in explored:
+                continue
+            child = Node(state=state, parent=node, action=action)
+            # Check for the goal as nodes are added to the frontier
+            if state == target:
+                path = []
+                while child.parent is not None:
+                    path.append((child.action, child.state))
+                    child = child.parent
+                path.reverse()
+                return path
+            frontier.add(child)
+
+    return None
+
+
+def separation_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    two person ids from the landmark index, which use_landmarks must
+    have loaded. Both are math.inf if they are not connected.
+    """
+    if landmarks is None:
+        raise ValueError("separation bounds need use_landmarks first")
+    return landmarks.bounds(
+        graph.person_index[source], graph.person_index[target]
+    )
+
+
+def use_landmarks(directory):
+    """
+    Load the landmark index saved in `directory` for the loaded data,
+    building and saving it first if it is missing or out of date.
+    """
+    global landmarks
+
+    landmarks = landmark_index(graph, directory)
 
 
 def person_id_for_name(name):
@@ -158,17 +371,34 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def find_people(name, limit=10):
+    """
+    Returns up to `limit` (person_id, name, birth) candidates for a
+    name without prompting: exact matches, then names or surnames
+    starting with `name`, then close matches for misspellings.
+    """
+    return name_index.search(name, limit)
+
+
+def complete_name(prefix, limit=10):
+    """
+    Returns up to `limit` (person_id, name, birth) candidates whose
+    name or surname starts with `prefix`, best known first.
+    """
+    return name_index.complete(prefix, limit)
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
-    neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
-    return neighbors
+    index = graph.person_index[person_id]
+    return {
+        (graph.movie_ids[graph.edge_movies[edge]],
+         graph.person_ids[graph.neighbors[edge]])
+        for edge in graph.edges(index)
+    }
 
 
 if __name__ == "__main__":
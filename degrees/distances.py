@@ -0,0 +1,135 @@
+import csv
+import sys
+from array import array
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import degrees
+from graph import Graph, distances_from
+
+# Graph rebuilt over shared memory in each worker process, and the
+# blocks it maps, which must stay open while the graph is in use
+worker_graph = None
+worker_blocks = []
+
+
+def main():
+    if len(sys.argv) < 4:
+        sys.exit("Usage: python distances.py directory output.csv person...")
+    directory, output, *seeds = sys.argv[1:]
+
+    print("Loading data...")
+    degrees.load_data(directory)
+    print("Data loaded.")
+
+    graph = degrees.graph
+    sources = []
+    for name in seeds:
+        if name in degrees.people:
+            person_id = name
+        else:
+            person_id = degrees.person_id_for_name(name)
+        if person_id is None:
+            sys.exit(f"Person not found: {name}")
+        sources.append(graph.person_index[person_id])
+
+    # One column of distances per seed, filled in as workers finish
+    columns = {}
+    for source, distances, _ in all_distances(graph, sources):
+        columns[source] = distances
+        reached = [d for d in distances if d > 0]
+        mean = sum(reached) / len(reached) if reached else 0
+        name = degrees.people[graph.person_ids[source]]["name"]
+        print(f"{name}: reaches {len(reached)} people, "
+              f"mean distance {mean:.3f}, "
+              f"max distance {max(reached, default=0)}")
+
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["person_id", "name"] + [graph.person_ids[s] for s in sources]
+        )
+        for person, person_id in enumerate(graph.person_ids):
+            writer.writerow(
+                [person_id, degrees.people[person_id]["name"]] +
+                [columns[s][person] for s in sources]
+            )
+
+
+def all_distances(graph, sources, processes=None, parents=False):
+    """
+    Yield (source, distances, parents) for every person index in
+    `sources`, as computed by graph.distances_from, in completion order.
+
+    Traversals run across a pool of `processes` workers (default: one
+    per core) that read the graph arrays from shared memory instead of
+    each receiving a copy. `parents` is None unless requested, and
+    holds edge positions in `graph` itself even if it has added edges.
+    """
+    # Workers only see the CSR arrays, so fold in any added edges first,
+    # remembering where each compacted edge sits in the caller's graph
+    positions = None
+    if graph.added:
+        if parents:
+            positions = array("i")
+            for person in range(len(graph)):
+                positions.extend(graph.edges(person))
+        graph = graph.compact()
+
+    blocks = [share(graph.offsets), share(graph.neighbors)]
+    try:
+        arguments = [(block.name, len(values)) for block, values in
+                     zip(blocks, (graph.offsets, graph.neighbors))]
+        with Pool(processes, initializer=attach, initargs=arguments) as pool:
+            tasks = ((source, parents) for source in sources)
+            for source, distances, edges in pool.imap_unordered(
+                    traverse, tasks):
+                if positions is not None:
+                    edges = array("i", (
+                        -1 if edge == -1 else positions[edge]
+                        for edge in edges
+                    ))
+                yield source, distances, edges
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def share(values):
+    """
+    Return a new SharedMemory block holding a copy of int array `values`.
+    """
+    data = memoryview(values).cast("B")
+    block = SharedMemory(create=True, size=max(len(data), 1))
+    block.buf[:len(data)] = data
+    return block
+
+
+def attach(offsets, neighbors):
+    """
+    Pool initializer: map the shared (name, length) offsets and neighbors
+    blocks and build the worker's graph over them.
+    """
+    global worker_graph
+
+    arrays = []
+    for name, length in (offsets, neighbors):
+        block = SharedMemory(name=name)
+        worker_blocks.append(block)
+        arrays.append(block.buf.cast("i")[:length])
+    person_count = len(arrays[0]) - 1
+    worker_graph = Graph(range(person_count), [], *arrays, None)
+
+
+def traverse(task):
+    """
+    Pool task: run distances_from for one (source, parents) task.
+    """
+    source, keep_parents = task
+    distances, parents = distances_from(worker_graph, source)
+    return source, distances, parents if keep_parents else None
+
+
+if __name__ == "__main__":
+    main()
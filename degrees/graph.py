@@ -0,0 +1,402 @@
+from array import array
+from bisect import bisect_right
+from collections import deque
+from itertools import chain
+
+
+class Graph():
+    """
+    Co-star graph with person and movie ids interned to dense integers.
+
+    Adjacency is stored in compressed sparse row (CSR) arrays: the edges
+    of person i are the positions offsets[i] to offsets[i + 1] - 1, and
+    for each edge position e, neighbors[e] is the co-star and
+    edge_movies[e] the movie they share.
+
+    Edges added after compiling are appended past the compiled ones and
+    listed per person in `added`; compact() folds them back into CSR.
+    """
+
+    def __init__(self, person_ids, movie_ids, offsets, neighbors, edge_movies):
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        self.person_index = {
+            person_id: i for i, person_id in enumerate(person_ids)
+        }
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.edge_movies = edge_movies
+
+        # Edge positions from `compiled` on were added by add_edge;
+        # added_sources holds the person each of them starts from
+        self.compiled = len(neighbors)
+        self.added = {}
+        self.added_sources = array("i")
+        self.movie_index = None
+        self.movie_stars = None
+
+    def __len__(self):
+        return len(self.person_ids)
+
+    def edges(self, person):
+        """
+        Return the edge positions for person index `person`.
+        """
+        edges = range(self.offsets[person], self.offsets[person + 1])
+        if person in self.added:
+            return chain(edges, self.added[person])
+        return edges
+
+    def source(self, edge):
+        """
+        Return the person index that edge position `edge` starts from.
+        """
+        if edge >= self.compiled:
+            return self.added_sources[edge - self.compiled]
+        return bisect_right(self.offsets, edge) - 1
+
+    def add_person(self, person_id):
+        """
+        Add a person with no edges and return their index.
+        """
+        self.make_mutable()
+        self.person_index[person_id] = len(self.person_ids)
+        self.person_ids.append(person_id)
+        self.offsets.append(self.offsets[-1])
+        return self.person_index[person_id]
+
+    def add_movie(self, movie_id):
+        """
+        Add a movie and return its index.
+        """
+        self.make_mutable()
+        # Builds movie_index on first use
+        self.movie_number(movie_id)
+        self.movie_index[movie_id] = len(self.movie_ids)
+        self.movie_ids.append(movie_id)
+        return self.movie_index[movie_id]
+
+    def movie_number(self, movie_id):
+        """
+        Return the index of `movie_id`, or None if it is not in the graph.
+        """
+        if self.movie_index is None:
+            self.movie_index = {
+                movie_id: i for i, movie_id in enumerate(self.movie_ids)
+            }
+        return self.movie_index.get(movie_id)
+
+    def stars(self, movie):
+        """
+        Return the person indices of the stars of movie index `movie`.
+
+        Every star has an edge to themselves through each of their
+        movies, so the index is built from those on first use rather
+        than kept alongside the graph.
+        """
+        if self.movie_stars is None:
+            self.movie_stars = {}
+            for person in range(len(self)):
+                for edge in self.edges(person):
+                    if self.neighbors[edge] == person:
+                        self.movie_stars.setdefault(
+                            self.edge_movies[edge], array("i")
+                        ).append(person)
+        return self.movie_stars.get(movie, ())
+
+    def add_edge(self, person, neighbor, movie):
+        """
+        Add an edge from person index `person` to `neighbor` through
+        movie index `movie`.
+        """
+        self.make_mutable()
+        self.added.setdefault(person, array("i")).append(len(self.neighbors))
+        self.added_sources.append(person)
+        self.neighbors.append(neighbor)
+        self.edge_movies.append(movie)
+        if person == neighbor and self.movie_stars is not None:
+            self.movie_stars.setdefault(movie, array("i")).append(person)
+
+    def make_mutable(self):
+        """
+        Replace read-only arrays (such as memory-mapped snapshot views)
+        with growable copies.
+        """
+        if not isinstance(self.person_ids, list):
+            self.person_ids = list(self.person_ids)
+        if not isinstance(self.movie_ids, list):
+            self.movie_ids = list(self.movie_ids)
+        for name in ("offsets", "neighbors", "edge_movies"):
+            values = getattr(self, name)
+            if not isinstance(values, array):
+                setattr(self, name, array("i", values))
+
+    def compact(self):
+        """
+        Return an equivalent Graph with every edge stored in CSR order.
+        """
+        offsets = array("i", [0])
+        neighbors = array("i")
+        edge_movies = array("i")
+        for person in range(len(self)):
+            for edge in self.edges(person):
+                neighbors.append(self.neighbors[edge])
+                edge_movies.append(self.edge_movies[edge])
+            offsets.append(len(neighbors))
+        return Graph(
+            list(self.person_ids), list(self.movie_ids),
+            offsets, neighbors, edge_movies
+        )
+
+
+class SearchStats():
+    """
+    Work done by one search, filled in by searches passed it as `stats`.
+
+    `expanded` counts people whose edges were scanned, `frontier_peak`
+    the largest number of people waiting to be expanded at once, and
+    `neighbor_sets` the neighbor collections built along the way (none
+    for searches over the compiled arrays). `seconds` is wall time.
+    """
+
+    __slots__ = ("expanded", "frontier_peak", "neighbor_sets", "seconds")
+
+    def __init__(self):
+        self.expanded = 0
+        self.frontier_peak = 0
+        self.neighbor_sets = 0
+        self.seconds = 0.0
+
+    def __repr__(self):
+        return (f"SearchStats(expanded={self.expanded}, "
+                f"frontier_peak={self.frontier_peak}, "
+                f"neighbor_sets={self.neighbor_sets}, "
+                f"seconds={self.seconds:.6f})")
+
+    def expand(self, count, frontier):
+        """
+        Record `count` more expanded people with `frontier` waiting.
+        """
+        self.expanded += count
+        if frontier > self.frontier_peak:
+            self.frontier_peak = frontier
+
+
+def compile_graph(person_ids, movie_ids, stars):
+    """
+    Compile people and movies into a Graph, where `stars` is an iterable
+    of (person, movie) index pairs into `person_ids` and `movie_ids`, in
+    any order and possibly repeated.
+
+    Every person gets one edge per (movie_id, person_id) pair that
+    neighbors_for_person would return for them, including themselves.
+    """
+    count = len(person_ids)
+    # One integer per pair removes repeats and sorts by movie, then person
+    keys = sorted({movie * count + person for person, movie in stars})
+
+    # Stars of each movie and movies of each person, both in CSR form
+    cast_offsets = array("i", [0]) * (len(movie_ids) + 1)
+    cast = array("i", [0]) * len(keys)
+    role_offsets = array("i", [0]) * (count + 1)
+    for i, key in enumerate(keys):
+        movie, person = divmod(key, count)
+        cast[i] = person
+        cast_offsets[movie + 1] += 1
+        role_offsets[person + 1] += 1
+    del keys
+    for i in range(len(movie_ids)):
+        cast_offsets[i + 1] += cast_offsets[i]
+    for i in range(count):
+        role_offsets[i + 1] += role_offsets[i]
+    roles = array("i", [0]) * len(cast)
+    filled = array("i", role_offsets[:-1])
+    for movie in range(len(movie_ids)):
+        for person in cast[cast_offsets[movie]:cast_offsets[movie + 1]]:
+            roles[filled[person]] = movie
+            filled[person] += 1
+
+    offsets = array("i", [0])
+    neighbors = array("i")
+    edge_movies = array("i")
+    for person in range(count):
+        for movie in roles[role_offsets[person]:role_offsets[person + 1]]:
+            start, end = cast_offsets[movie], cast_offsets[movie + 1]
+            neighbors.extend(cast[start:end])
+            edge_movies.extend(array("i", [movie]) * (end - start))
+        offsets.append(len(neighbors))
+
+    return Graph(person_ids, movie_ids, offsets, neighbors, edge_movies)
+
+
+def breadth_first_search(graph, source, target, stats=None):
+    """
+    Return the shortest list of (movie, person) index pairs from person
+    index `source` to `target` using a one-sided breadth-first search,
+    or None if there is no path.
+    """
+    if source == target:
+        return []
+
+    # Maps each reached person to the edge position it was reached by
+    parents = {source: -1}
+    frontier = deque([source])
+    while frontier:
+        if stats is not None:
+            stats.expand(1, len(frontier))
+        person = frontier.popleft()
+        for edge in graph.edges(person):
+            neighbor = graph.neighbors[edge]
+            if neighbor in parents:
+                continue
+            parents[neighbor] = edge
+            # Check for the goal as nodes are added to the frontier
+            if neighbor == target:
+                return trace(graph, parents, target)
+            frontier.append(neighbor)
+
+    return None
+
+
+def bidirectional_search(graph, source, target, stats=None):
+    """
+    Return the shortest list of (movie, person) index pairs from person
+    index `source` to `target`, or None if there is no path, by
+    expanding breadth-first from both ends at once.
+
+    Each step expands one whole level of the smaller frontier, so the
+    number of explored people grows with the square root of what a
+    one-sided search needs on long paths.
+    """
+    if source == target:
+        return []
+
+    # Map each reached person to the edge position leading back towards
+    # the side's origin, or -1 for the origin itself
+    forward = {source: -1}
+    backward = {target: -1}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        if stats is not None:
+            stats.expand(
+                min(len(forward_frontier), len(backward_frontier)),
+                len(forward_frontier) + len(backward_frontier)
+            )
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_level(
+                graph, forward_frontier, forward, backward
+            )
+        else:
+            backward_frontier, meeting = expand_level(
+                graph, backward_frontier, backward, forward
+            )
+        if meeting is not None:
+            path = trace(graph, forward, meeting)
+            path.extend(retrace(graph, backward, meeting))
+            return path
+
+    return None
+
+
+def expand_level(graph, frontier, parents, other_parents):
+    """
+    Expand every person in `frontier` by one step, recording parents.
+
+    Returns the next frontier and the person where this side met the
+    other side with the shortest combined path, or None if they did
+    not meet. The whole level is expanded before choosing a meeting
+    point so that the joined path is guaranteed to be shortest.
+    """
+    next_frontier = []
+    meeting = None
+    best = None
+    for person in frontier:
+        for edge in graph.edges(person):
+            neighbor = graph.neighbors[edge]
+            if neighbor in parents:
+                continue
+            parents[neighbor] = edge
+            next_frontier.append(neighbor)
+            if neighbor in other_parents:
+                length = depth(graph, other_parents, neighbor)
+                if best is None or length < best:
+                    meeting, best = neighbor, length
+    return next_frontier, meeting
+
+
+def depth(graph, parents, person):
+    """
+    Return the number of edges between `person` and the origin of the
+    search side described by `parents`.
+    """
+    length = 0
+    while parents[person] != -1:
+        person = graph.source(parents[person])
+        length += 1
+    return length
+
+
+def distances_from(graph, source):
+    """
+    Run one breadth-first traversal from person index `source` over the
+    whole graph.
+
+    Returns (distances, parents): arrays indexed by person, holding the
+    number of edges from the source (-1 if unreachable) and the edge
+    position each person was first reached by (-1 for the source and
+    unreachable people). trace(graph, parents, person) turns the latter
+    into a path.
+    """
+    distances = array("i", [-1]) * len(graph)
+    parents = array("i", [-1]) * len(graph)
+    distances[source] = 0
+    frontier = [source]
+    distance = 0
+    while frontier:
+        distance += 1
+        next_frontier = []
+        for person in frontier:
+            for edge in graph.edges(person):
+                neighbor = graph.neighbors[edge]
+                if distances[neighbor] == -1:
+                    distances[neighbor] = distance
+                    parents[neighbor] = edge
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+    return distances, parents
+
+
+def trace(graph, parents, person):
+    """
+    Return the (movie, person) index pairs leading from the origin of
+    `parents` to `person`.
+    """
+    path = []
+    while parents[person] != -1:
+        edge = parents[person]
+        path.append((graph.edge_movies[edge], person))
+        person = graph.source(edge)
+    path.reverse()
+    return path
+
+
+def retrace(graph, parents, person):
+    """
+    Return the (movie, person) index pairs leading from `person` back
+    to the origin of `parents`.
+    """
+    path = []
+    while parents[person] != -1:
+        edge = parents[person]
+        person = graph.source(edge)
+        path.append((graph.edge_movies[edge], person))
+    return path
+
+
+# Search algorithms selectable by name in degrees.shortest_path
+SEARCHES = {
+    "bidirectional": bidirectional_search,
+    "breadth-first": breadth_first_search,
+}
@@ -0,0 +1,255 @@
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import struct
+from array import array
+
+from graph import distances_from, trace
+
+# Number of landmarks chosen by build_landmarks
+LANDMARKS = 16
+
+# Landmarks are at least this many edges apart from each other
+SEPARATION = 2
+
+LANDMARKS_FILE = "degrees.landmarks"
+
+# Bump whenever the layout below changes
+LANDMARKS_VERSION = 2
+
+MAGIC = b"DEGL"
+
+# Magic, version, number of landmarks, number of people and number of
+# edges of the graph the distances were computed on, and a digest of
+# that graph's people and edges
+LAYOUT = struct.Struct("=4sIQQQ32s")
+
+# Sizes of the landmark indices and of the stored distances
+INDEX_SIZE = struct.calcsize("i")
+DISTANCE_SIZE = struct.calcsize("h")
+
+
+class LandmarkIndex():
+    """
+    Breadth-first distances from a few landmark people to everyone.
+
+    By the triangle inequality, the distance between any two people is
+    at least |d(L, s) - d(L, t)| and at most d(L, s) + d(L, t) for every
+    landmark L, which bounds it in time proportional to the number of
+    landmarks. A landmark that reaches only one of the two people
+    proves they are not connected.
+    """
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        # One sequence of distances per landmark, -1 where unreachable
+        self.distances = distances
+
+    def bounds(self, source, target):
+        """
+        Return (lower, upper) bounds on the number of edges between
+        person indices `source` and `target`.
+
+        Both are math.inf if the two are provably not connected, and
+        upper is math.inf if no landmark reaches either of them.
+        """
+        lower = 0
+        upper = math.inf
+        for distances in self.distances:
+            a = distances[source]
+            b = distances[target]
+            if a == -1 and b == -1:
+                continue
+            if a == -1 or b == -1:
+                return math.inf, math.inf
+            lower = max(lower, abs(a - b))
+            upper = min(upper, a + b)
+        return lower, upper
+
+    def lower_bound(self, source, target):
+        """
+        Return the lower bound from bounds(source, target).
+        """
+        return self.bounds(source, target)[0]
+
+
+def build_landmarks(graph, count=LANDMARKS):
+    """
+    Choose up to `count` well-connected landmarks and compute their
+    distances to everyone in `graph`.
+
+    Landmarks are taken in order of decreasing number of edges, skipping
+    anyone within SEPARATION edges of a landmark already chosen, so
+    that they are spread over the graph instead of clustered in one
+    movie.
+    """
+    candidates = sorted(
+        range(len(graph)),
+        key=lambda person: graph.offsets[person + 1] - graph.offsets[person],
+        reverse=True
+    )
+    landmarks = array("i")
+    distances = []
+    for person in candidates:
+        if len(landmarks) == count:
+            break
+        if any(0 <= d[person] <= SEPARATION for d in distances):
+            continue
+        landmarks.append(person)
+        distances.append(array("h", distances_from(graph, person)[0]))
+    return LandmarkIndex(landmarks, distances)
+
+
+def update_landmarks(index, graph, edges):
+    """
+    Return a new index for `graph` after the (person, neighbor) index
+    pairs in `edges` were added to it, leaving `index` untouched.
+
+    Adding edges can only shorten distances, so each landmark's
+    distances are lowered from the new edges outwards instead of being
+    recomputed from scratch.
+    """
+    updated = []
+    for old in index.distances:
+        distances = array("h", old)
+        distances.extend(array("h", [-1]) * (len(graph) - len(distances)))
+        heap = []
+        for person, neighbor in edges:
+            distance = distances[person]
+            if distance != -1 and (distances[neighbor] == -1 or
+                                   distance + 1 < distances[neighbor]):
+                distances[neighbor] = distance + 1
+                heapq.heappush(heap, (distance + 1, neighbor))
+        while heap:
+            distance, person = heapq.heappop(heap)
+            if distance > distances[person]:
+                continue
+            for edge in graph.edges(person):
+                neighbor = graph.neighbors[edge]
+                if (distances[neighbor] == -1 or
+                        distance + 1 < distances[neighbor]):
+                    distances[neighbor] = distance + 1
+                    heapq.heappush(heap, (distance + 1, neighbor))
+        updated.append(distances)
+    return LandmarkIndex(array("i", index.landmarks), updated)
+
+
+def graph_digest(graph):
+    """
+    Return a digest of the people and edges of `graph`, which changes
+    whenever any edge does, even if the numbers of people and edges stay
+    the same.
+    """
+    if graph.added:
+        graph = graph.compact()
+    digest = hashlib.blake2b(digest_size=32)
+    digest.update("\n".join(graph.person_ids).encode("utf-8"))
+    digest.update(memoryview(graph.offsets).cast("B"))
+    digest.update(memoryview(graph.neighbors).cast("B"))
+    return digest.digest()
+
+
+def save_landmarks(index, graph, filename):
+    """
+    Write `index`, computed on `graph`, to `filename`.
+    """
+    with open(filename, "wb") as f:
+        f.write(LAYOUT.pack(
+            MAGIC, LANDMARKS_VERSION, len(index.landmarks), len(graph),
+            len(graph.neighbors), graph_digest(graph)
+        ))
+        f.write(memoryview(index.landmarks).cast("B"))
+        for distances in index.distances:
+            f.write(memoryview(distances).cast("B"))
+
+
+def load_landmarks(graph, filename):
+    """
+    Load an index written by save_landmarks, memory-mapping the
+    distances.
+
+    Returns None if the file is missing, unreadable, from another
+    version, or was computed on a graph with different people or edges.
+    """
+    try:
+        with open(filename, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, count, people, edges,
+         digest) = LAYOUT.unpack_from(mapping)
+    except (OSError, ValueError, struct.error):
+        return None
+    if (magic != MAGIC or version != LANDMARKS_VERSION or
+            people != len(graph) or edges != len(graph.neighbors) or
+            digest != graph_digest(graph)):
+        return None
+
+    view = memoryview(mapping)
+    start = LAYOUT.size
+    end = start + INDEX_SIZE * count + DISTANCE_SIZE * count * people
+    if len(view) < end:
+        return None
+    landmarks = view[start:start + INDEX_SIZE * count].cast("i")
+    start += INDEX_SIZE * count
+    distances = []
+    for _ in range(count):
+        distances.append(view[start:start + DISTANCE_SIZE * people].cast("h"))
+        start += DISTANCE_SIZE * people
+    return LandmarkIndex(landmarks, distances)
+
+
+def landmark_index(graph, directory, count=LANDMARKS):
+    """
+    Return the landmark index saved in `directory` for `graph`, building
+    and saving a new one if there is none or it does not match.
+    """
+    filename = os.path.join(directory, LANDMARKS_FILE)
+    index = load_landmarks(graph, filename)
+    if index is None:
+        index = build_landmarks(graph, count)
+        try:
+            save_landmarks(index, graph, filename)
+        except OSError:
+            pass
+    return index
+
+
+def landmark_search(graph, index, source, target, stats=None):
+    """
+    Return the shortest list of (movie, person) index pairs from person
+    index `source` to `target`, or None if there is no path, using A*
+    search with the landmark lower bound as its heuristic.
+
+    The bound never overestimates and changes by at most one along an
+    edge, so the first time the target is taken off the heap its path
+    is shortest.
+    """
+    if source == target:
+        return []
+    if index.lower_bound(source, target) == math.inf:
+        return None
+
+    parents = {source: -1}
+    costs = {source: 0}
+    # Ties on estimated total prefer people further from the source
+    heap = [(index.lower_bound(source, target), 0, source)]
+    while heap:
+        _, cost, person = heapq.heappop(heap)
+        cost = -cost
+        if person == target:
+            return trace(graph, parents, target)
+        if cost > costs[person]:
+            continue
+        if stats is not None:
+            stats.expand(1, len(heap) + 1)
+        for edge in graph.edges(person):
+            neighbor = graph.neighbors[edge]
+            if cost + 1 >= costs.get(neighbor, math.inf):
+                continue
+            costs[neighbor] = cost + 1
+            parents[neighbor] = edge
+            estimate = cost + 1 + index.lower_bound(neighbor, target)
+            heapq.heappush(heap, (estimate, -(cost + 1), neighbor))
+
+    return None
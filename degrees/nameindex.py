@@ -0,0 +1,298 @@
+import gc
+import heapq
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Number of candidates returned by default
+LIMIT = 10
+
+# Trigrams shared by more people than this are too common to narrow a
+# fuzzy search down and are skipped while gathering candidates
+COMMON = 5000
+
+# Fuzzy matches scoring below this Dice coefficient are not returned
+THRESHOLD = 0.4
+
+# Prefixes matching more keys than this have their TOP highest weighted
+# people ranked in advance, so that one or two letter prefixes stay fast;
+# completing any other prefix ranks all of its matches
+SCAN = 5000
+TOP = 100
+
+# Sorts after every character, to find where keys with a prefix end
+LAST = chr(0x10FFFF)
+
+# Fuzzy search rescores at most this many candidates per result wanted
+RESCORE = 20
+
+
+class NameIndex():
+    """
+    Index of people's names for non-interactive lookups.
+
+    Names are normalized (case, accents and spacing folded) and kept in
+    a sorted array, once from the start of the name and once from the
+    start of each later word, so prefix completion is a binary search
+    that also matches surnames. A trigram index over the same names
+    finds close matches for names with typos.
+    """
+
+    def __init__(self):
+        # Per person: IMDB id, name, birth, a ranking weight, and the
+        # number of distinct trigrams in their name
+        self.person_ids = []
+        self.names = []
+        self.births = []
+        self.weights = array("i")
+        self.sizes = array("i")
+
+        # Sorted normalized keys and the person position of each
+        self.keys = []
+        self.positions = array("i")
+
+        # Maps each trigram to the positions of people whose name has it
+        self.trigrams = {}
+
+        # Maps prefixes matching more than SCAN keys to the positions of
+        # up to TOP people with them, highest weights first
+        self.top = {}
+
+    def add(self, person_id, name, birth, weight=0):
+        """
+        Add a person, ranked among equally good matches by `weight`
+        (such as their number of movies).
+        """
+        position = len(self.person_ids)
+        self.person_ids.append(person_id)
+        self.names.append(name)
+        self.births.append(birth)
+        self.weights.append(weight)
+
+        key = normalize(name)
+        for start in word_starts(key):
+            index = bisect_left(self.keys, key[start:])
+            self.keys.insert(index, key[start:])
+            self.positions.insert(index, position)
+            for end in range(1, len(key) - start + 1):
+                top = self.top.get(key[start:start + end])
+                if top is not None and position not in top:
+                    top.append(position)
+                    top.sort(key=self.rank)
+                    del top[TOP:]
+        self.add_trigrams(position, key)
+
+    def add_trigrams(self, position, key):
+        """
+        Index the trigrams of normalized `key` for person `position`.
+        """
+        key_trigrams = set(trigrams(key))
+        self.sizes.append(len(key_trigrams))
+        for trigram in key_trigrams:
+            self.trigrams.setdefault(trigram, array("i")).append(position)
+
+    def complete(self, prefix, limit=LIMIT):
+        """
+        Return up to `limit` (person_id, name, birth) candidates whose
+        name, or a later word of it, starts with `prefix`, with the
+        highest weights first.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        if prefix in self.top and limit <= TOP:
+            ranked = self.top[prefix]
+        else:
+            start, end = self.prefix_range(prefix)
+            ranked = heapq.nsmallest(
+                limit, set(self.positions[start:end]), key=self.rank
+            )
+        return [self.candidate(p) for p in ranked[:limit]]
+
+    def fuzzy(self, name, limit=LIMIT):
+        """
+        Return up to `limit` (person_id, name, birth) candidates whose
+        names share the most trigrams with `name`, best first.
+        """
+        key = normalize(name)
+        query = set(trigrams(key))
+        if len(key) < 3:
+            return []
+
+        # Gather candidates from the rarest trigrams, skipping very common
+        # ones unless nothing else matches
+        postings = sorted(
+            (self.trigrams[t] for t in query if t in self.trigrams), key=len
+        )
+        selective = [p for p in postings if len(p) <= COMMON]
+        counts = {}
+        for posting in selective or postings[:1]:
+            for position in posting:
+                counts[position] = counts.get(position, 0) + 1
+        best = sorted(counts, key=counts.get, reverse=True)
+
+        # Score the likeliest candidates on all of their trigrams
+        scored = []
+        for position in best[:limit * RESCORE]:
+            shared = len(query.intersection(
+                trigrams(normalize(self.names[position]))
+            ))
+            score = 2 * shared / (len(query) + self.sizes[position])
+            if score >= THRESHOLD:
+                scored.append((-score, -self.weights[position], position))
+        scored.sort()
+        return [self.candidate(p) for _, _, p in scored[:limit]]
+
+    def search(self, name, limit=LIMIT):
+        """
+        Return up to `limit` (person_id, name, birth) candidates for
+        `name`: exact matches first, then prefix completions, then
+        fuzzy matches.
+        """
+        key = normalize(name)
+        results = []
+        seen = set()
+        exact = []
+        index = bisect_left(self.keys, key)
+        while index < len(self.keys) and self.keys[index] == key:
+            position = self.positions[index]
+            if normalize(self.names[position]) == key:
+                exact.append(self.candidate(position))
+            index += 1
+        for candidates in (exact, self.complete(name, limit)):
+            add_candidates(results, seen, candidates, limit)
+        # Only look for close matches if the others fall short
+        if len(results) < limit:
+            add_candidates(results, seen, self.fuzzy(name, limit), limit)
+        return results
+
+    def prefix_range(self, prefix, start=0, end=None):
+        """
+        Return the (start, end) range of keys starting with `prefix`,
+        searching only keys from `start` to `end`.
+        """
+        end = len(self.keys) if end is None else end
+        start = bisect_left(self.keys, prefix, start, end)
+        return start, bisect_right(self.keys, prefix + LAST, start, end)
+
+    def rank(self, position):
+        """
+        Sort key putting people with higher weights first.
+        """
+        return -self.weights[position], position
+
+    def rank_prefixes(self):
+        """
+        Fill `top` for every prefix matching more than SCAN keys. The
+        keys with such a prefix are only split by the next character
+        while they are still that many, so this reads each key once per
+        level of popular prefixes.
+        """
+        self.top = {}
+        pending = [""]
+        while pending:
+            prefix = pending.pop()
+            start, end = self.prefix_range(prefix)
+            # Keys equal to the prefix itself have no next character
+            start = bisect_right(self.keys, prefix, start, end)
+            while start < end:
+                longer = self.keys[start][:len(prefix) + 1]
+                _, stop = self.prefix_range(longer, start, end)
+                if stop - start > SCAN:
+                    self.top[longer] = heapq.nsmallest(
+                        TOP, set(self.positions[start:stop]), key=self.rank
+                    )
+                    pending.append(longer)
+                start = stop
+
+    def candidate(self, position):
+        return (
+            self.person_ids[position],
+            self.names[position],
+            self.births[position]
+        )
+
+
+def build_name_index(people, weights):
+    """
+    Return a NameIndex over the `people` dictionary built by load_data,
+    ranking people with greater `weights` (their number of movies, in
+    the same order) first.
+    """
+    index = NameIndex()
+    keys = []
+    postings = {}
+    # Millions of small acyclic objects; collecting while building them
+    # only costs time
+    gc.disable()
+    try:
+        for position, (person_id, person) in enumerate(people.items()):
+            index.person_ids.append(person_id)
+            index.names.append(person["name"])
+            index.births.append(person["birth"])
+            index.weights.append(weights[position])
+            key = normalize(person["name"])
+            for start in word_starts(key):
+                keys.append((key[start:], position))
+            key_trigrams = set(trigrams(key))
+            index.sizes.append(len(key_trigrams))
+            for trigram in key_trigrams:
+                posting = postings.get(trigram)
+                if posting is None:
+                    postings[trigram] = [position]
+                else:
+                    posting.append(position)
+
+        # Sorting once is much faster than inserting every key in order
+        keys.sort()
+        index.keys = [key for key, _ in keys]
+        index.positions = array("i", (position for _, position in keys))
+        index.trigrams = {
+            trigram: array("i", posting)
+            for trigram, posting in postings.items()
+        }
+        index.rank_prefixes()
+    finally:
+        gc.enable()
+    return index
+
+
+def add_candidates(results, seen, candidates, limit):
+    """
+    Append `candidates` whose person_id is not in `seen` to `results`,
+    up to `limit` results in total.
+    """
+    for candidate in candidates:
+        if len(results) == limit:
+            break
+        if candidate[0] not in seen:
+            seen.add(candidate[0])
+            results.append(candidate)
+
+
+def normalize(name):
+    """
+    Return `name` lowercased, without accents, and with runs of
+    whitespace collapsed to single spaces.
+    """
+    if name.isascii():
+        return " ".join(name.lower().split())
+    name = unicodedata.normalize("NFKD", name.lower())
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(name.split())
+
+
+def word_starts(key):
+    """
+    Return the index of the start of every word in normalized `key`.
+    """
+    return [0] + [i + 1 for i, c in enumerate(key) if c == " "]
+
+
+def trigrams(key):
+    """
+    Return the trigrams of normalized `key`, padded so that the start
+    and end of the name count as well.
+    """
+    padded = f"  {key} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
@@ -0,0 +1,320 @@
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import degrees
+
+PORT = 8050
+
+# Number of answered queries kept in memory by query()
+CACHE_SIZE = 100000
+
+# Seconds between checks for rows appended to the CSV files while serving
+UPDATE_INTERVAL = 10
+
+# Maps (source_id, target_id) to the path found between them
+cache = {}
+
+# Guards the cache; only held briefly, never during a search
+cache_lock = threading.Lock()
+
+
+class ReadWriteLock():
+    """
+    Lock that any number of readers can hold at once, or one writer
+    alone. A waiting writer keeps new readers out, so a steady stream
+    of queries cannot hold off an update forever.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writer = False
+        self.writers_waiting = 0
+
+    @contextmanager
+    def reading(self):
+        with self.condition:
+            while self.writer or self.writers_waiting:
+                self.condition.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        with self.condition:
+            self.writers_waiting += 1
+            while self.writer or self.readers:
+                self.condition.wait()
+            self.writers_waiting -= 1
+            self.writer = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writer = False
+                self.condition.notify_all()
+
+
+# Searches and name lookups share the loaded data as readers; applying
+# appended CSV rows changes it, so it excludes them as the writer
+data_lock = ReadWriteLock()
+
+
+def main():
+    usage = "Usage: python service.py directory (batch [file] | serve [port])"
+    if len(sys.argv) < 3 or sys.argv[2] not in ("batch", "serve"):
+        sys.exit(usage)
+    directory, mode, *args = sys.argv[1:]
+    if len(args) > 1:
+        sys.exit(usage)
+
+    # Load once, then answer every query against the resident graph
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(directory)
+    print("Data loaded.", file=sys.stderr)
+
+    if mode == "batch":
+        if not args or args[0] == "-":
+            run_batch(sys.stdin, sys.stdout)
+        else:
+            with open(args[0], encoding="utf-8") as f:
+                run_batch(f, sys.stdout)
+    else:
+        port = int(args[0]) if args else PORT
+        # Lets the server skip unconnected pairs and keep more of its
+        # cache when the data is updated
+        degrees.use_landmarks(directory)
+        serve(port, directory)
+
+
+def run_batch(lines, output):
+    """
+    Answer one query per tab-separated "source<TAB>target" line of
+    `lines`, writing each result to `output` as a JSON line.
+
+    Blank lines and lines starting with # are skipped.
+    """
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.strip() or line.startswith("#"):
+            continue
+        try:
+            source, target = line.split("\t")
+        except ValueError:
+            result = {"query": line, "error": "expected source<TAB>target"}
+        else:
+            result = query(source, target)
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+
+
+def serve(port, directory):
+    """
+    Answer GET /path?source=...&target=... requests, and name lookups
+    at /complete?name=... and /search?name=..., on localhost:`port`
+    until interrupted, handling each request in its own thread.
+
+    Rows appended to the CSV files in `directory` are applied every
+    UPDATE_INTERVAL seconds without reloading.
+    """
+    updater = threading.Thread(
+        target=poll_updates, args=(directory,), daemon=True
+    )
+    updater.start()
+    server = ThreadingHTTPServer(("127.0.0.1", port), QueryHandler)
+    print(f"Serving on http://127.0.0.1:{port}/path", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def poll_updates(directory):
+    """
+    Apply appended CSV rows from `directory` every UPDATE_INTERVAL
+    seconds, forever.
+    """
+    while True:
+        time.sleep(UPDATE_INTERVAL)
+        update(directory)
+
+
+def update(directory):
+    """
+    Apply rows appended to the CSV files in `directory` and drop the
+    cached answers they may have changed.
+    """
+    with data_lock.writing():
+        old_landmarks = degrees.landmarks
+        touched = degrees.update_data(directory)
+        if touched:
+            with cache_lock:
+                invalidate(touched, old_landmarks)
+
+
+def invalidate(touched, index):
+    """
+    Drop cached answers that gaining co-stars for the `touched` person
+    ids may have changed, using landmark `index` (computed before the
+    update) to keep the ones it proves unaffected.
+
+    A new shorter path of fewer than d edges from s must leave s over
+    old edges and reach a touched person within d - 2 of them, so a
+    cached path of d edges survives if every touched person is further
+    than that from s. Paths of one edge cannot get shorter.
+    """
+    touched = [degrees.graph.person_index[person_id] for person_id in touched]
+    for key, path in list(cache.items()):
+        if path is not None and len(path) <= 1:
+            continue
+        if path is not None and index is not None:
+            source = degrees.graph.person_index[key[0]]
+            if all(index.lower_bound(source, person) > len(path) - 2
+                   for person in touched):
+                continue
+        del cache[key]
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path in ("/complete", "/search"):
+            if "name" not in params:
+                self.send_json(400, {"error": "name is required"})
+            else:
+                lookup = (degrees.complete_name if url.path == "/complete"
+                          else degrees.find_people)
+                with data_lock.reading():
+                    candidates = lookup(params["name"][0])
+                self.send_json(200, {"candidates": format_people(candidates)})
+        elif url.path != "/path":
+            self.send_json(404, {"error": "not found"})
+        elif "source" not in params or "target" not in params:
+            self.send_json(400, {"error": "source and target are required"})
+        else:
+            result = query(params["source"][0], params["target"][0])
+            self.send_json(400 if "error" in result else 200, result)
+
+    def send_json(self, status, result):
+        body = json.dumps(result).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep the access log off stderr; it is the slowest part of a
+        # warm request
+        pass
+
+
+def query(source, target):
+    """
+    Return a JSON-serializable result for the shortest path between
+    `source` and `target`, each either a person id or a name.
+
+    Names that match no one or several people produce an "error" entry
+    (with "candidates" for ambiguous names) instead of prompting.
+    """
+    with data_lock.reading():
+        return answer(source, target)
+
+
+def answer(source, target):
+    """
+    Return the result for query() while sharing the data with other
+    readers. The cache lock is taken only around cache lookups and
+    inserts, so cache hits are not held up by slow searches.
+    """
+    result = {"source": source, "target": target}
+    source_id = resolve(source, result)
+    if source_id is None:
+        return result
+    target_id = resolve(target, result)
+    if target_id is None:
+        return result
+
+    key = (source_id, target_id)
+    with cache_lock:
+        cached = key in cache
+        if cached:
+            path = cache.pop(key)
+            # Reinsert so the least recently used answer is evicted first
+            cache[key] = path
+    if not cached:
+        path = degrees.shortest_path(source_id, target_id)
+        with cache_lock:
+            cache[key] = path
+            while len(cache) > CACHE_SIZE:
+                del cache[next(iter(cache))]
+
+    result["source_id"] = source_id
+    result["target_id"] = target_id
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [
+            {
+                "movie_id": movie_id,
+                "title": degrees.movies[movie_id]["title"],
+                "person_id": person_id,
+                "name": degrees.people[person_id]["name"]
+            }
+            for movie_id, person_id in path
+        ]
+    return result
+
+
+def resolve(name, result):
+    """
+    Return the person id for an id or name, or None after recording why
+    it could not be resolved in `result`.
+    """
+    if name in degrees.people:
+        return name
+    person_ids = sorted(degrees.names.get(name.lower(), set()))
+    if len(person_ids) == 1:
+        return person_ids[0]
+    if not person_ids:
+        result["error"] = f"person not found: {name}"
+        result["candidates"] = format_people(degrees.find_people(name))
+    else:
+        result["error"] = f"ambiguous name: {name}"
+        result["candidates"] = format_people(
+            (person_id, degrees.people[person_id]["name"],
+             degrees.people[person_id]["birth"])
+            for person_id in person_ids
+        )
+    return None
+
+
+def format_people(candidates):
+    """
+    Return (person_id, name, birth) `candidates` as JSON objects.
+    """
+    return [
+        {"person_id": person_id, "name": name, "birth": birth}
+        for person_id, name, birth in candidates
+    ]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import gc
+import mmap
+import os
+import pickle
+import struct
+import sys
+
+from graph import Graph
+
+# Bump whenever the layout below or the pickled metadata changes
+SNAPSHOT_VERSION = 4
+
+SNAPSHOT_FILE = "degrees.snapshot"
+
+# Files whose size and modification time key the snapshot
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+MAGIC = b"DEGS"
+
+# Magic, version, length of the pickled header, then the three array
+# lengths (offsets, neighbors, edge_movies)
+LAYOUT = struct.Struct("=4sIQQQQ")
+
+# Size of the C ints the graph arrays are stored as
+ITEM_SIZE = struct.calcsize("i")
+
+
+def source_key(directory):
+    """
+    Return a tuple identifying the current contents of the CSV files
+    in `directory` by their sizes and modification times.
+    """
+    key = [sys.byteorder]
+    for filename in SOURCES:
+        stat = os.stat(os.path.join(directory, filename))
+        key.append((filename, stat.st_size, stat.st_mtime_ns))
+    return tuple(key)
+
+
+def save_snapshot(directory, names, people, movies, graph, name_index):
+    """
+    Write `names`, `people`, `movies`, the compiled `graph` and the
+    `name_index` to a snapshot file in `directory`.
+
+    Returns False, leaving any previous snapshot alone, if the
+    directory cannot be written to.
+    """
+    if graph.added:
+        graph = graph.compact()
+
+    path = os.path.join(directory, SNAPSHOT_FILE)
+    temp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp, "wb") as f:
+            # Pickle straight into the file rather than into one large
+            # bytes object first, then fill in the layout once the
+            # header's length is known
+            f.write(bytes(LAYOUT.size))
+            pickle.dump(
+                (source_key(directory), names, people, movies,
+                 graph.person_ids, graph.movie_ids, name_index),
+                f, protocol=pickle.HIGHEST_PROTOCOL
+            )
+            # Align the arrays so they can be cast directly from the mapping
+            padding = -f.tell() % ITEM_SIZE
+            f.write(bytes(padding))
+            header_size = f.tell() - LAYOUT.size
+            for values in (graph.offsets, graph.neighbors, graph.edge_movies):
+                f.write(memoryview(values).cast("B"))
+            f.seek(0)
+            f.write(LAYOUT.pack(
+                MAGIC, SNAPSHOT_VERSION, header_size,
+                len(graph.offsets), len(graph.neighbors),
+                len(graph.edge_movies)
+            ))
+        os.replace(temp, path)
+    except OSError:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def load_snapshot(directory):
+    """
+    Load a snapshot written by save_snapshot from `directory`.
+
+    Returns (names, people, movies, graph, name_index), with the graph
+    arrays memory-mapped from the file, or None if there is no snapshot
+    or it is stale, from another version, or unreadable.
+    """
+    path = os.path.join(directory, SNAPSHOT_FILE)
+    try:
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, version, header_size, *lengths = LAYOUT.unpack_from(mapping)
+        if magic != MAGIC or version != SNAPSHOT_VERSION:
+            return None
+        start = LAYOUT.size
+        # The header is millions of small objects that cannot form cycles,
+        # so collecting while unpickling it only costs time
+        gc.disable()
+        try:
+            (key, names, people, movies,
+             person_ids, movie_ids, name_index) = pickle.loads(
+                memoryview(mapping)[start:start + header_size]
+            )
+        finally:
+            gc.enable()
+        if key != source_key(directory):
+            return None
+
+        arrays = []
+        start += header_size
+        for length in lengths:
+            end = start + ITEM_SIZE * length
+            arrays.append(memoryview(mapping)[start:end].cast("i"))
+            start = end
+    except (OSError, ValueError, EOFError, struct.error,
+            pickle.UnpicklingError):
+        return None
+
+    graph = Graph(person_ids, movie_ids, *arrays)
+    return names, people, movies, graph, name_index
@@ -0,0 +1,119 @@
+import csv
+import json
+import os
+import sys
+from multiprocessing import Pool
+
+from heredity import METHODS, load_data
+
+# Families handed to a worker at a time; small families take well under
+# a millisecond, so sending them one by one would cost more than solving
+CHUNKSIZE = 16
+
+
+def main():
+    if len(sys.argv) not in (3, 4, 5):
+        sys.exit("Usage: python batch.py (directory | manifest) "
+                 "output.(jsonl | csv) [method] [processes]")
+    source, output = sys.argv[1:3]
+    method = sys.argv[3] if len(sys.argv) > 3 else "elimination"
+    processes = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    if method not in METHODS:
+        sys.exit(f"Method must be one of: {', '.join(METHODS)}")
+    if not output.endswith((".jsonl", ".csv")):
+        sys.exit("Output must be a .jsonl or .csv file")
+
+    families = family_files(source)
+    print(f"Inferring {len(families)} families...", file=sys.stderr)
+    failed = 0
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        write = (json_writer if output.endswith(".jsonl") else csv_writer)(f)
+        for family, probabilities, error in infer_all(families, method,
+                                                      processes):
+            if error is not None:
+                failed += 1
+                print(f"{family}: {error}", file=sys.stderr)
+                continue
+            for person, distributions in probabilities.items():
+                write(family, person, distributions)
+    print(f"Done, {failed} failed.", file=sys.stderr)
+
+
+def family_files(source):
+    """
+    Return the paths of the family CSV files in directory `source`, or
+    listed one per line in the manifest file `source`, relative to the
+    manifest's directory unless absolute. Blank lines and lines starting
+    with # in a manifest are skipped.
+    """
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, filename)
+            for filename in os.listdir(source)
+            if filename.endswith(".csv")
+        )
+    base = os.path.dirname(source)
+    with open(source, encoding="utf-8") as f:
+        return [
+            os.path.join(base, line.strip()) for line in f
+            if line.strip() and not line.startswith("#")
+        ]
+
+
+def infer_all(families, method, processes=None):
+    """
+    Yield (family, probabilities, error) for every path in `families`,
+    in completion order, with inference by `method` spread across a pool
+    of `processes` workers (default: one per core). `error` is None
+    unless the family could not be read or solved.
+    """
+    tasks = ((family, method) for family in families)
+    with Pool(processes) as pool:
+        yield from pool.imap_unordered(infer, tasks, chunksize=CHUNKSIZE)
+
+
+def infer(task):
+    """
+    Pool task: load one (family, method) and compute its distributions.
+    """
+    family, method = task
+    try:
+        people = load_data(family)
+        return family, METHODS[method](people), None
+    except (OSError, KeyError, ValueError, csv.Error) as e:
+        return family, None, f"{type(e).__name__}: {e}"
+
+
+def json_writer(f):
+    """
+    Return a function writing one person's distributions to `f` as a
+    JSON object per line.
+    """
+    def write(family, person, distributions):
+        f.write(json.dumps({
+            "family": family,
+            "person": person,
+            "gene": {str(g): p for g, p in distributions["gene"].items()},
+            "trait": distributions["trait"][True]
+        }) + "\n")
+    return write
+
+
+def csv_writer(f):
+    """
+    Return a function writing one person's distributions to `f` as a
+    CSV row, after a header row.
+    """
+    writer = csv.writer(f)
+    writer.writerow(["family", "person", "gene_2", "gene_1", "gene_0",
+                     "trait"])
+
+    def write(family, person, distributions):
+        genes = distributions["gene"]
+        writer.writerow([family, person, genes[2], genes[1], genes[0],
+                         distributions["trait"][True]])
+    return write
+
+
+if __name__ == "__main__":
+    main()
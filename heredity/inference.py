@@ -0,0 +1,250 @@
+import numpy as np
+
+# Number of copies of the gene a person can have
+GENES = (0, 1, 2)
+
+# Gene assignments evaluated together by vectorized_probabilities
+BLOCK = 1 << 16
+
+
+class Factor():
+    """
+    Table of nonnegative values over some gene variables, with one axis
+    of length 3 per variable, in the order of `variables`.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = table
+
+
+def inheritance_table(probs):
+    """
+    Return the 3 x 3 x 3 array of P(child genes | mother genes, father
+    genes), indexed [mother, father, child].
+
+    A parent with no copies passes the gene on only by mutation, one
+    with two copies always does unless it mutates, and one with one copy
+    passes it on half of the time either way.
+    """
+    mutation = probs["mutation"]
+    passes = np.array([mutation, 0.5, 1 - mutation])
+    mother = passes[:, None]
+    father = passes[None, :]
+    return np.stack([
+        (1 - mother) * (1 - father),
+        mother * (1 - father) + (1 - mother) * father,
+        mother * father
+    ], axis=-1)
+
+
+def trait_likelihood(probs, trait):
+    """
+    Return P(trait | genes) for each number of genes, or all ones if the
+    trait is unknown.
+    """
+    if trait is None:
+        return np.ones(len(GENES))
+    return np.array([probs["trait"][genes][trait] for genes in GENES])
+
+
+def family_factors(people, probs):
+    """
+    Return the factors of the family Bayesian network for `people`, as
+    returned by load_data, with the known traits as evidence.
+
+    There is one factor per person: the gene prior for people without
+    both parents in the data, or the inheritance table over the person
+    and both parents, times the likelihood of the person's known trait.
+    """
+    inheritance = inheritance_table(probs)
+    prior = np.array([probs["gene"][genes] for genes in GENES])
+    factors = []
+    for person, data in people.items():
+        likelihood = trait_likelihood(probs, data["trait"])
+        if data["mother"] and data["father"]:
+            factors.append(Factor(
+                (data["mother"], data["father"], person),
+                inheritance * likelihood
+            ))
+        else:
+            factors.append(Factor((person,), prior * likelihood))
+    return factors
+
+
+def multiply(factors, keep):
+    """
+    Return the product of `factors`, summed over every variable not in
+    `keep`.
+    """
+    variables = []
+    for factor in factors:
+        for variable in factor.variables:
+            if variable not in variables:
+                variables.append(variable)
+    axis = {variable: i for i, variable in enumerate(variables)}
+    operands = []
+    for factor in factors:
+        operands.append(factor.table)
+        operands.append([axis[variable] for variable in factor.variables])
+    kept = [variable for variable in variables if variable in keep]
+    table = np.einsum(*operands, [axis[variable] for variable in kept])
+    return Factor(kept, table)
+
+
+def elimination_order(factors, query):
+    """
+    Return an order in which to sum out every variable except `query`,
+    greedily picking the variable whose elimination creates the smallest
+    factor (the min-neighbors heuristic), so the work stays exponential
+    only in the width of the pedigree rather than its size.
+    """
+    neighbors = {}
+    for factor in factors:
+        for variable in factor.variables:
+            neighbors.setdefault(variable, set()).update(factor.variables)
+    for variable in neighbors:
+        neighbors[variable].discard(variable)
+
+    order = []
+    remaining = set(neighbors) - {query}
+    while remaining:
+        variable = min(remaining, key=lambda v: (len(neighbors[v]), str(v)))
+        for neighbor in neighbors[variable]:
+            neighbors[neighbor] |= neighbors[variable] - {neighbor}
+            neighbors[neighbor].discard(variable)
+        del neighbors[variable]
+        remaining.remove(variable)
+        order.append(variable)
+    return order
+
+
+def connected_factors(factors, query):
+    """
+    Return the factors that share a variable, directly or through other
+    factors, with `query`; the rest belong to people unrelated to it
+    and cannot change its distribution.
+    """
+    reached = {query}
+    connected = []
+    pending = list(factors)
+    while True:
+        linked = [f for f in pending if reached.intersection(f.variables)]
+        if not linked:
+            return connected
+        pending = [f for f in pending
+                   if not reached.intersection(f.variables)]
+        for factor in linked:
+            reached.update(factor.variables)
+        connected.extend(linked)
+
+
+def gene_marginal(factors, person):
+    """
+    Return the normalized distribution of the number of genes `person`
+    has given the evidence in `factors`, by variable elimination.
+    """
+    factors = connected_factors(factors, person)
+    for variable in elimination_order(factors, person):
+        involved = [f for f in factors if variable in f.variables]
+        factors = [f for f in factors if variable not in f.variables]
+        keep = set()
+        for factor in involved:
+            keep.update(factor.variables)
+        keep.discard(variable)
+        factor = multiply(involved, keep)
+        # A factor over no variables only scales the result, which is
+        # normalized anyway; keeping them would leave one per group of
+        # unrelated people for the final product
+        if not factor.variables:
+            continue
+        # Rescale as we go so that long pedigrees do not underflow
+        total = factor.table.sum()
+        if total > 0:
+            factor.table /= total
+        factors.append(factor)
+    marginal = multiply(factors, {person}).table
+    return marginal / marginal.sum()
+
+
+def eliminate_probabilities(people, probs):
+    """
+    Return the same gene and trait distributions for every person as
+    enumerating every assignment, computed by variable elimination.
+
+    Each person's gene distribution is found by summing every other
+    gene variable out of the network; their trait distribution then
+    follows from P(trait | genes), since nobody's trait affects anyone
+    else's genes.
+    """
+    factors = family_factors(people, probs)
+    probabilities = {}
+    for person, data in people.items():
+        genes = gene_marginal(factors, person)
+        if data["trait"] is None:
+            trait = sum(genes[g] * probs["trait"][g][True] for g in GENES)
+        else:
+            trait = float(data["trait"])
+        probabilities[person] = {
+            "gene": {g: float(genes[g]) for g in (2, 1, 0)},
+            "trait": {True: float(trait), False: float(1 - trait)}
+        }
+    return probabilities
+
+
+def vectorized_probabilities(people, probs, block=BLOCK):
+    """
+    Return the same gene and trait distributions for every person as
+    enumerating every assignment, enumerated with NumPy arrays.
+
+    Every assignment of genes to people is numbered in base 3, and
+    `block` of them at a time are decoded into a (block, people) array
+    and weighted by their joint probability with a few array operations
+    per person. Unknown traits are summed out in closed form rather than
+    enumerated, since P(trait | genes) sums to 1 over the two traits.
+    """
+    names = list(people)
+    index = {name: i for i, name in enumerate(names)}
+    inheritance = inheritance_table(probs)
+    prior = np.array([probs["gene"][genes] for genes in GENES])
+    has_trait = np.array([probs["trait"][genes][True] for genes in GENES])
+    likelihoods = [trait_likelihood(probs, people[name]["trait"])
+                   for name in names]
+    parents = [
+        (index[people[name]["mother"]], index[people[name]["father"]])
+        if people[name]["mother"] and people[name]["father"] else None
+        for name in names
+    ]
+
+    genes_total = np.zeros((len(names), len(GENES)))
+    trait_total = np.zeros(len(names))
+    powers = 3 ** np.arange(len(names), dtype=np.int64)
+    for start in range(0, 3 ** len(names), block):
+        codes = np.arange(start, min(start + block, 3 ** len(names)))
+        genes = (codes[:, None] // powers) % 3
+
+        weights = np.ones(len(codes))
+        for i in range(len(names)):
+            if parents[i] is None:
+                weights *= prior[genes[:, i]]
+            else:
+                mother, father = parents[i]
+                weights *= inheritance[genes[:, mother], genes[:, father],
+                                       genes[:, i]]
+            weights *= likelihoods[i][genes[:, i]]
+
+        for i in range(len(names)):
+            genes_total[i] += np.bincount(genes[:, i], weights=weights,
+                                          minlength=len(GENES))
+            trait_total[i] += weights @ has_trait[genes[:, i]]
+
+    probabilities = {}
+    for i, name in enumerate(names):
+        total = genes_total[i].sum()
+        trait = people[name]["trait"]
+        trait = trait_total[i] / total if trait is None else float(trait)
+        probabilities[name] = {
+            "gene": {g: float(genes_total[i][g] / total) for g in (2, 1, 0)},
+            "trait": {True: float(trait), False: float(1 - trait)}
+        }
+    return probabilities
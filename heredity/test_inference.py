@@ -0,0 +1,46 @@
+import unittest
+
+from heredity import PROBS, enumerate_probabilities
+from inference import eliminate_probabilities
+
+
+def person(name, mother=None, father=None, trait=None):
+    return {"name": name, "mother": mother, "father": father, "trait": trait}
+
+
+class EliminationTest(unittest.TestCase):
+
+    def test_many_unrelated_people(self):
+        """
+        Each unrelated person leaves a factor over no variables behind;
+        more than 64 of them must not reach a single einsum call.
+        """
+        people = {}
+        for i in range(70):
+            name = f"p{i}"
+            people[name] = person(name, trait=(None, True, False)[i % 3])
+        probabilities = eliminate_probabilities(people, PROBS)
+        self.assertEqual(len(probabilities), 70)
+        for name, data in people.items():
+            genes = probabilities[name]["gene"]
+            self.assertAlmostEqual(sum(genes.values()), 1)
+
+    def test_matches_enumeration(self):
+        people = {
+            "Lily": person("Lily", trait=False),
+            "James": person("James", trait=True),
+            "Harry": person("Harry", "Lily", "James"),
+            "Arthur": person("Arthur", trait=False),
+            "Molly": person("Molly"),
+            "Ron": person("Ron", "Molly", "Arthur", trait=True),
+        }
+        expected = enumerate_probabilities(people)
+        actual = eliminate_probabilities(people, PROBS)
+        for name in people:
+            for field in ("gene", "trait"):
+                for value, p in expected[name][field].items():
+                    self.assertAlmostEqual(actual[name][field][value], p)
+
+
+if __name__ == "__main__":
+    unittest.main()
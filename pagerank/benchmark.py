@@ -0,0 +1,224 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from crawler import crawl_graph
+from linkgraph import LinkGraph, save_graph
+from sampling import sample_ranks
+from solvers import METHODS, solve
+
+# Seed for synthetic graphs and sampling, so runs are comparable
+SEED = 50
+
+DAMPING = 0.85
+
+# Pages sampled when timing sample_ranks
+SAMPLES = 1000000
+
+# Tolerance of the solvers timed, and of the reference solve they and
+# sampling are checked against
+TOLERANCE = 1e-8
+REFERENCE_TOLERANCE = 1e-14
+
+# Average out-links per page
+DEGREE = 8
+
+# Share of the pages of "islands" graphs split off into sites of SITE
+# pages, and the chance that a link in a site crosses to its other half
+ISLANDS = 0.05
+SITE = 20
+CROSS = 0.02
+
+# Graphs as (name, generator, pages, fraction of dangling pages)
+SCALES = [
+    ("erdos-renyi-1k", "erdos-renyi", 1000, 0.0),
+    ("barabasi-albert-1k", "barabasi-albert", 1000, 0.0),
+    ("dangling-1k", "barabasi-albert", 1000, 0.5),
+    ("erdos-renyi-100k", "erdos-renyi", 100000, 0.0),
+    ("barabasi-albert-100k", "barabasi-albert", 100000, 0.0),
+    ("dangling-100k", "barabasi-albert", 100000, 0.5),
+    ("islands-1k", "islands", 1000, 0.0),
+    ("islands-100k", "islands", 100000, 0.0),
+]
+
+# Largest graph written out as HTML files to time crawling
+CRAWL_LIMIT = 20000
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python benchmark.py [directory]")
+
+    with tempfile.TemporaryDirectory() as temp:
+        directory = sys.argv[1] if len(sys.argv) == 2 else temp
+        for name, generator, pages, dangling in SCALES:
+            print(f"Generating {name}...")
+            graph = synthetic_graph(generator, pages, dangling)
+            path = os.path.join(directory, name)
+            if len(graph) <= CRAWL_LIMIT:
+                write_corpus(graph, path)
+            else:
+                path += ".lgraph"
+                save_graph(graph, path)
+            report(name, graph, benchmark(graph, path))
+
+
+def synthetic_graph(generator, pages, dangling=0.0, degree=DEGREE,
+                    seed=SEED):
+    """
+    Return a LinkGraph of `pages` pages named "0.html", "1.html", ...
+    (zero-padded) with about `degree` out-links each, made by `generator`:
+
+    "erdos-renyi" links every page to pages chosen uniformly at random;
+    "barabasi-albert" adds pages one at a time, linking each to pages
+    chosen in proportion to the links they already have, which gives a
+    few pages most of the links like on the web;
+    "islands" is "erdos-renyi" with some pages split off into sites,
+    like the disconnected parts of a crawl (see island_links).
+
+    A `dangling` fraction of the pages then have their out-links removed.
+    """
+    rng = np.random.default_rng(seed)
+    if generator == "erdos-renyi":
+        sources = np.repeat(np.arange(pages), degree)
+        targets = rng.integers(pages, size=len(sources))
+    elif generator == "barabasi-albert":
+        sources, targets = preferential_links(pages, degree, rng)
+    elif generator == "islands":
+        sources, targets = island_links(pages, degree, rng)
+    else:
+        raise ValueError(f"unknown generator {generator}")
+
+    if dangling:
+        keep = rng.random(pages) >= dangling
+        links = keep[sources]
+        sources, targets = sources[links], targets[links]
+    return graph_from_links(pages, sources, targets)
+
+
+def preferential_links(pages, degree, rng):
+    """
+    Return (sources, targets) arrays of `degree` links from each page to
+    earlier pages, chosen in proportion to one plus their in-links.
+    """
+    sources = np.repeat(np.arange(pages), degree)
+    targets = np.zeros(len(sources), dtype=np.int64)
+    # Every page once, then the target of every link made so far, so a
+    # uniform choice from the filled part favours linked pages
+    pool = np.zeros(pages + len(sources), dtype=np.int64)
+    filled = 0
+    for page in range(pages):
+        pool[filled] = page
+        filled += 1
+        if page == 0:
+            continue
+        start = page * degree
+        chosen = pool[rng.integers(filled - 1, size=degree)]
+        targets[start:start + degree] = chosen
+        pool[filled:filled + degree] = chosen
+        filled += degree
+    return sources, targets
+
+
+def island_links(pages, degree, rng):
+    """
+    Return (sources, targets) arrays of `degree` links from each page.
+
+    The last ISLANDS of the pages form sites of SITE pages that only
+    link within their own site, and mostly within their own half of it,
+    so their ranks settle much more slowly than those of the rest, which
+    link to each other uniformly at random.
+    """
+    core = pages - int(pages * ISLANDS) // SITE * SITE
+    sources = np.repeat(np.arange(pages), degree)
+    targets = rng.integers(core, size=len(sources))
+    linked = sources >= core
+    site = core + (sources[linked] - core) // SITE * SITE
+    half = (sources[linked] - site) // (SITE // 2)
+    half ^= rng.random(len(site)) < CROSS
+    targets[linked] = (site + half * (SITE // 2)
+                       + rng.integers(SITE // 2, size=len(site)))
+    return sources, targets
+
+
+def graph_from_links(pages, sources, targets):
+    """
+    Return a LinkGraph of `pages` pages with the links from `sources` to
+    `targets`, dropping duplicates and links from a page to itself.
+    """
+    links = np.unique(np.stack([sources, targets])[:, sources != targets],
+                      axis=1)
+    offsets = np.zeros(pages + 1, dtype=np.int64)
+    np.cumsum(np.bincount(links[0], minlength=pages), out=offsets[1:])
+    # Zero-padded so that names sort in page order, as crawl sorts them
+    width = len(str(max(pages - 1, 0)))
+    names = [f"{i:0{width}}.html" for i in range(pages)]
+    return LinkGraph(names, offsets, links[1].astype(np.int32))
+
+
+def write_corpus(graph, directory):
+    """
+    Write LinkGraph `graph` to `directory` as one HTML file per page,
+    like the corpora crawl reads.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for i, page in enumerate(graph.pages):
+        links = graph.targets[graph.offsets[i]:graph.offsets[i + 1]]
+        with open(os.path.join(directory, page), "w") as f:
+            f.write("<!DOCTYPE html>\n<html>\n<body>\n")
+            for j in links.tolist():
+                f.write(f'<a href="{graph.pages[j]}">{graph.pages[j]}</a>\n')
+            f.write("</body>\n</html>\n")
+
+
+def benchmark(graph, path):
+    """
+    Time crawling `path` if it is a corpus directory, sampling, and every
+    solver on `graph`. Return a list of (stage, seconds, iterations,
+    L1 error against a reference solve) with None where not applicable.
+    """
+    reference = solve(graph, DAMPING, tolerance=REFERENCE_TOLERANCE).ranks
+    results = []
+
+    if os.path.isdir(path):
+        began = time.perf_counter()
+        crawled = crawl_graph(path)
+        seconds = time.perf_counter() - began
+        same = (np.array_equal(crawled.offsets, graph.offsets)
+                and np.array_equal(crawled.targets, graph.targets))
+        results.append(("crawl", seconds, None, 0.0 if same else None))
+
+    began = time.perf_counter()
+    ranks = sample_ranks(graph, DAMPING, SAMPLES, seed=SEED)
+    seconds = time.perf_counter() - began
+    results.append(("sampling", seconds, None,
+                    np.abs(ranks - reference).sum()))
+
+    for method in METHODS:
+        result = solve(graph, DAMPING, method, tolerance=TOLERANCE)
+        results.append((method, result.seconds, result.iterations,
+                        np.abs(result.ranks - reference).sum()))
+    return results
+
+
+def report(name, graph, results):
+    """
+    Print one line per stage with its time, iterations and error.
+    """
+    print(f"{name}: {len(graph)} pages, {len(graph.targets)} links, "
+          f"{int(graph.dangling().sum())} dangling")
+    print(f"  {'stage':<14}{'ms':>10}{'iterations':>12}{'L1 error':>12}")
+    for stage, seconds, iterations, error in results:
+        print(
+            f"  {stage:<14}"
+            f"{seconds * 1000:>10.2f}"
+            f"{'' if iterations is None else iterations:>12}"
+            f"{'mismatch' if error is None else f'{error:.2e}':>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import os
+import posixpath
+import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from linkgraph import LinkGraph, save_graph
+
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Characters read from a file at a time
+CHUNK = 1 << 16
+
+# Characters kept from the end of one chunk for the next, so that a
+# link split across two chunks is still found
+OVERLAP = 4096
+
+# Files parsed concurrently per worker; bounds memory on huge corpora
+QUEUED = 4
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python crawler.py corpus graph")
+    graph = crawl_graph(sys.argv[1])
+    save_graph(graph, sys.argv[2])
+    print(f"{len(graph)} pages, {len(graph.targets)} links")
+
+
+def html_files(directory):
+    """
+    Yield the path of every .html file under `directory`, at any depth,
+    relative to it and with "/" separators, in a stable order.
+    """
+    for root, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        relative = os.path.relpath(root, directory)
+        for filename in sorted(filenames):
+            if filename.endswith(".html"):
+                path = os.path.normpath(os.path.join(relative, filename))
+                yield path.replace(os.sep, "/")
+
+
+def parse_page(directory, page):
+    """
+    Return (page, links) for the HTML file `page` under `directory`,
+    where links is the set of pages it links to other than itself,
+    resolved relative to the page's own directory.
+
+    The file is read in bounded chunks rather than all at once.
+    """
+    base = posixpath.dirname(page)
+    links = set()
+    buffer = ""
+    with open(os.path.join(directory, page)) as f:
+        for chunk in iter(lambda: f.read(CHUNK), ""):
+            buffer += chunk
+            keep = max(0, len(buffer) - OVERLAP)
+            for match in LINK.finditer(buffer):
+                links.add(posixpath.normpath(posixpath.join(base, match[1])))
+                keep = max(keep, match.end())
+            buffer = buffer[keep:]
+    links.discard(page)
+    return page, links
+
+
+def stream_pages(directory, pages=None, workers=None, processes=False):
+    """
+    Yield (page, links) as returned by parse_page for every page in
+    `pages`, by default every HTML file under `directory` in the order
+    of html_files.
+
+    Files are parsed by a pool of `workers` threads (default: one per
+    core), or processes if `processes` is true, with only a few files
+    per worker in flight.
+    """
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(workers) as pool:
+        limit = QUEUED * workers
+        pending = deque()
+        if pages is None:
+            pages = html_files(directory)
+        for page in pages:
+            pending.append(pool.submit(parse_page, directory, page))
+            if len(pending) >= limit:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class GraphBuilder():
+    """
+    Builds a LinkGraph from (page, links) records as they arrive.
+
+    Every page name is interned once, so link sets do not keep their
+    own copies of the names they point to.
+    """
+
+    def __init__(self):
+        # Maps every page name seen, as a page or a link, to its number
+        self.index = {}
+        self.names = []
+        # Link numbers of each page added, by page number
+        self.links = {}
+
+    def intern(self, name):
+        number = self.index.get(name)
+        if number is None:
+            number = self.index[name] = len(self.names)
+            self.names.append(name)
+        return number
+
+    def add(self, page, links):
+        """
+        Add `page` and the names of the pages it links to.
+        """
+        self.links[self.intern(page)] = np.array(
+            [self.intern(link) for link in links], dtype=np.int32
+        )
+
+    def build(self):
+        """
+        Return a LinkGraph of the pages added so far, keeping only links
+        to pages that were added themselves.
+        """
+        numbers = sorted(self.links, key=self.names.__getitem__)
+        remap = np.full(len(self.names), -1, dtype=np.int32)
+        remap[numbers] = np.arange(len(numbers), dtype=np.int32)
+
+        offsets = np.zeros(len(numbers) + 1, dtype=np.int64)
+        targets = []
+        for i, number in enumerate(numbers):
+            links = remap[self.links[number]]
+            links = np.unique(links[links >= 0])
+            targets.append(links)
+            offsets[i + 1] = offsets[i] + len(links)
+        targets = (np.concatenate(targets) if targets
+                   else np.zeros(0, dtype=np.int32))
+        pages = [self.names[number] for number in numbers]
+        return LinkGraph(pages, offsets, targets.astype(np.int32))
+
+
+def crawl_graph(directory, workers=None, processes=False):
+    """
+    Crawl every HTML file under `directory` and return its LinkGraph.
+    """
+    builder = GraphBuilder()
+    for page, links in stream_pages(directory, None, workers, processes):
+        builder.add(page, links)
+    return builder.build()
+
+
+if __name__ == "__main__":
+    main()
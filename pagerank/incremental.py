@@ -0,0 +1,178 @@
+import os
+import pickle
+import sys
+
+import numpy as np
+
+from crawler import GraphBuilder, html_files, stream_pages
+from linkgraph import LinkGraph
+from solvers import TOLERANCE, power_iteration
+
+# Bump whenever the pickled state below changes
+STATE_VERSION = 1
+
+STATE_FILE = "pagerank.state"
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python incremental.py corpus [damping]")
+    damping = float(sys.argv[2]) if len(sys.argv) == 3 else 0.85
+    ranks, changes = update_pagerank(sys.argv[1], damping)
+    print(f"{changes['parsed']} of {len(ranks)} pages parsed, "
+          f"{changes['changed']} with new links, "
+          f"{changes['removed']} removed")
+    for page in sorted(ranks):
+        print("  %s: %.4f" % (page, ranks[page]))
+
+
+def update_pagerank(directory, damping_factor, tolerance=TOLERANCE,
+                    state=None):
+    """
+    Return PageRank values for the HTML files under `directory`, reusing
+    the state saved by the previous call for the same directory.
+
+    Only files whose size or modification time changed are parsed again,
+    and iteration starts from the previous ranks, so a run after a small
+    edit costs a few iterations instead of a full crawl and solve. The
+    state is kept in STATE_FILE in `directory` unless `state` gives
+    another path.
+
+    Returns (ranks, changes), where ranks maps page names to PageRank
+    values and changes counts the pages "parsed", "changed" (whose links
+    differ) and "removed" since the previous run.
+    """
+    path = os.path.join(directory, STATE_FILE) if state is None else state
+    previous = load_state(path)
+    old_files = previous["files"]
+    old_ranks = previous["ranks"]
+
+    files = {}
+    stale = []
+    for page in html_files(directory):
+        stat = os.stat(os.path.join(directory, page))
+        key = (stat.st_size, stat.st_mtime_ns)
+        old = old_files.get(page)
+        if old is not None and old[0] == key:
+            files[page] = old
+        else:
+            stale.append((page, key))
+
+    keys = dict(stale)
+    rows = {}
+    for page, links in stream_pages(directory, keys):
+        old = old_files.get(page)
+        if old is None or old[1] != links:
+            rows[page] = links
+        files[page] = (keys[page], links)
+    removed = len(old_files.keys() - files.keys())
+    changes = {"parsed": len(stale), "changed": len(rows), "removed": removed}
+
+    graph = previous["graph"]
+    if (not rows and not removed
+            and previous["damping"] == damping_factor
+            and previous["tolerance"] <= tolerance):
+        ranks = old_ranks
+    else:
+        if (graph is not None and not removed
+                and rows.keys() <= old_files.keys()):
+            # Same pages as before, so only the rows of pages whose links
+            # changed need rewriting
+            graph = patch_graph(graph, rows)
+        else:
+            builder = GraphBuilder()
+            for page, (_, links) in files.items():
+                builder.add(page, links)
+            graph = builder.build()
+        start = None
+        if old_ranks and len(graph):
+            # New pages start at the average rank
+            start = np.fromiter(
+                (old_ranks.get(page, 1.0 / len(graph)) for page in graph.pages),
+                dtype=np.float64, count=len(graph)
+            )
+        values = (power_iteration(graph, damping_factor, tolerance,
+                                  start=start)
+                  if len(graph) else [])
+        ranks = dict(zip(graph.pages, np.asarray(values).tolist()))
+
+    save_state(path, {
+        "files": files,
+        "graph": graph,
+        "ranks": ranks,
+        "damping": damping_factor,
+        "tolerance": tolerance,
+    })
+    return ranks, changes
+
+
+def patch_graph(graph, rows):
+    """
+    Return a copy of LinkGraph `graph` with the out-links of each page
+    in `rows` replaced by the set of page names it maps to.
+
+    Every page in `rows` must already be in `graph`; links to pages that
+    are not are dropped.
+    """
+    index = {page: i for i, page in enumerate(graph.pages)}
+    changed = np.zeros(len(graph), dtype=bool)
+    degrees = graph.out_degrees().copy()
+    new_targets = {}
+    for page, links in rows.items():
+        i = index[page]
+        targets = sorted(index[link] for link in links
+                         if link in index and link != page)
+        changed[i] = True
+        degrees[i] = len(targets)
+        new_targets[i] = targets
+
+    offsets = np.zeros(len(graph) + 1, dtype=np.int64)
+    np.cumsum(degrees, out=offsets[1:])
+    targets = np.empty(offsets[-1], dtype=np.int32)
+    kept = np.repeat(~changed, graph.out_degrees())
+    targets[np.repeat(~changed, degrees)] = graph.targets[kept]
+    for i, values in new_targets.items():
+        targets[offsets[i]:offsets[i + 1]] = values
+    return LinkGraph(graph.pages, offsets, targets)
+
+
+def load_state(path):
+    """
+    Return the state saved by save_state at `path`, or an empty state if
+    there is none or it is from another version or unreadable.
+    """
+    try:
+        with open(path, "rb") as f:
+            version, state = pickle.load(f)
+        if version == STATE_VERSION:
+            return state
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+        pass
+    return {"files": {}, "graph": None, "ranks": {}, "damping": None,
+            "tolerance": None}
+
+
+def save_state(path, state):
+    """
+    Write `state` to `path`, replacing any previous state at once.
+
+    Returns False, leaving any previous state alone, if the file cannot
+    be written.
+    """
+    temp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp, "wb") as f:
+            pickle.dump((STATE_VERSION, state), f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, path)
+    except OSError:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    main()
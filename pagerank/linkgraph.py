@@ -0,0 +1,210 @@
+import struct
+
+import numpy as np
+import scipy.sparse
+
+# Bump whenever the layout below changes
+GRAPH_VERSION = 1
+
+MAGIC = b"LGRF"
+
+# Magic, version, then the number of pages, links and bytes of names;
+# the header is followed by the name offsets and link offsets (int64,
+# one more than there are pages), the link targets (int32) and the
+# UTF-8 page names back to back
+LAYOUT = struct.Struct("<4sIQQQ")
+
+
+class LinkGraph():
+    """
+    Link graph with page names interned to dense integers.
+
+    Out-links are stored in compressed sparse row (CSR) arrays: page i
+    links to targets[offsets[i]:offsets[i + 1]], with no duplicates and
+    no links from a page to itself.
+    """
+
+    def __init__(self, pages, offsets, targets):
+        self.pages = pages
+        self.offsets = offsets
+        self.targets = targets
+
+    def __len__(self):
+        return len(self.pages)
+
+    def out_degrees(self):
+        """
+        Return the number of out-links of every page.
+        """
+        return np.diff(self.offsets)
+
+    def dangling(self):
+        """
+        Return a boolean mask of the pages with no out-links, which the
+        random surfer leaves for any page in the corpus, itself included.
+        """
+        return self.out_degrees() == 0
+
+    def transition_matrix(self):
+        """
+        Return the column-stochastic sparse matrix M of following a
+        link: M[j, i] = 1 / out-degree(i) if page i links to page j.
+
+        Columns of dangling pages are all zero; the solvers spread their
+        rank over every page separately.
+        """
+        n = len(self)
+        degrees = self.out_degrees()
+        sources = np.repeat(np.arange(n), degrees)
+        weights = 1.0 / degrees[sources]
+        return scipy.sparse.csr_matrix(
+            (weights, (self.targets, sources)), shape=(n, n)
+        )
+
+    def corpus(self):
+        """
+        Return the graph as a corpus dictionary, mapping each page to the
+        set of pages it links to, as returned by crawl.
+        """
+        return {
+            page: {self.pages[j] for j in
+                   self.targets[self.offsets[i]:self.offsets[i + 1]].tolist()}
+            for i, page in enumerate(self.pages)
+        }
+
+
+def compile_corpus(corpus):
+    """
+    Compile a `corpus` dictionary as returned by crawl, mapping each
+    page to the set of pages it links to, into a LinkGraph.
+
+    Links to pages outside the corpus and links to the page itself
+    are dropped.
+    """
+    pages = sorted(corpus)
+    index = {page: i for i, page in enumerate(pages)}
+    offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+    targets = []
+    for i, page in enumerate(pages):
+        links = sorted(
+            index[link] for link in set(corpus[page])
+            if link in index and link != page
+        )
+        targets.extend(links)
+        offsets[i + 1] = offsets[i] + len(links)
+    return LinkGraph(pages, offsets, np.array(targets, dtype=np.int32))
+
+
+class PageTable():
+    """
+    Read-only sequence of page names stored back to back in a byte
+    buffer, decoding each name only when it is asked for.
+    """
+
+    def __init__(self, offsets, names):
+        self.offsets = offsets
+        self.names = names
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("page index out of range")
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return bytes(self.names[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        names = bytes(self.names)
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield names[start:end].decode("utf-8")
+
+
+def as_graph(corpus):
+    """
+    Return `corpus` if it is already a LinkGraph, else compile it.
+    """
+    if isinstance(corpus, LinkGraph):
+        return corpus
+    return compile_corpus(corpus)
+
+
+def teleport_matrix(graph, personalizations):
+    """
+    Return an N x B array whose columns are the teleport distributions
+    of the B `personalizations` over the pages of LinkGraph `graph`.
+
+    Each personalization is either a collection of page names, teleported
+    to with equal probability, or a dictionary mapping page names to
+    nonnegative weights, which are normalized to sum to 1.
+    """
+    index = {page: i for i, page in enumerate(graph.pages)}
+    teleport = np.zeros((len(graph), len(personalizations)))
+    for column, personalization in enumerate(personalizations):
+        if not isinstance(personalization, dict):
+            personalization = dict.fromkeys(personalization, 1.0)
+        for page, weight in personalization.items():
+            if page not in index:
+                raise ValueError(f"{page} is not in the corpus")
+            if weight < 0:
+                raise ValueError(f"negative weight for {page}")
+            teleport[index[page], column] += weight
+        total = teleport[:, column].sum()
+        if total <= 0:
+            raise ValueError(f"personalization {column} has no weight")
+        teleport[:, column] /= total
+    return teleport
+
+
+def save_graph(graph, path):
+    """
+    Write LinkGraph `graph` to the file at `path` in the layout read by
+    load_graph.
+    """
+    encoded = [page.encode("utf-8") for page in graph.pages]
+    name_offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+    np.cumsum([len(name) for name in encoded], out=name_offsets[1:])
+    with open(path, "wb") as f:
+        f.write(LAYOUT.pack(MAGIC, GRAPH_VERSION, len(graph),
+                            len(graph.targets), int(name_offsets[-1])))
+        f.write(name_offsets.tobytes())
+        f.write(np.asarray(graph.offsets, dtype="<i8").tobytes())
+        f.write(np.asarray(graph.targets, dtype="<i4").tobytes())
+        f.write(b"".join(encoded))
+
+
+def load_graph(path):
+    """
+    Return the LinkGraph saved by save_graph at `path`, with its arrays
+    and page names memory-mapped from the file rather than read.
+
+    Raises ValueError if the file is not a graph of this version.
+    """
+    mapping = np.memmap(path, dtype=np.uint8, mode="r")
+    if len(mapping) < LAYOUT.size:
+        raise ValueError(f"{path} is not a link graph")
+    magic, version, pages, links, size = LAYOUT.unpack(
+        bytes(mapping[:LAYOUT.size])
+    )
+    if magic != MAGIC or version != GRAPH_VERSION:
+        raise ValueError(f"{path} is not a version {GRAPH_VERSION} link graph")
+
+    lengths = [8 * (pages + 1), 8 * (pages + 1), 4 * links, size]
+    if len(mapping) != LAYOUT.size + sum(lengths):
+        raise ValueError(f"{path} is truncated")
+    sections = []
+    start = LAYOUT.size
+    for length in lengths:
+        sections.append(mapping[start:start + length])
+        start += length
+    name_offsets, offsets, targets, names = sections
+    return LinkGraph(
+        PageTable(name_offsets.view("<i8"), names),
+        offsets.view("<i8"),
+        targets.view("<i4")
+    )
@@ -0,0 +1,136 @@
+import os
+import sys
+import tempfile
+from array import array
+
+import numpy as np
+
+from crawler import html_files, stream_pages
+from solvers import MAX_ITERATIONS, TOLERANCE
+
+# Links per block file; each block takes 8 bytes per link while it is
+# being ranked
+BLOCK_EDGES = 1 << 22
+
+BLOCK_FILE = "block-{:05}.npy"
+DEGREES_FILE = "degrees.npy"
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python outofcore.py corpus [blocks]")
+    with tempfile.TemporaryDirectory() as temp:
+        workdir = sys.argv[2] if len(sys.argv) == 3 else temp
+        blocks = shard_corpus(sys.argv[1], workdir)
+        ranks = blocked_iteration(blocks, 0.85)
+    print(f"PageRank Results from {len(blocks)} blocks")
+    for page, rank in zip(blocks.pages, ranks.tolist()):
+        print("  %s: %.4f" % (page, rank))
+
+
+class EdgeBlocks():
+    """
+    Links of a corpus kept on disk in `directory` as block files, each a
+    2 x K array of (source, target) page numbers, together with the
+    out-degree of every page.
+    """
+
+    def __init__(self, directory, pages, count):
+        self.directory = directory
+        self.pages = pages
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """
+        Yield the blocks one at a time, memory-mapped from their files.
+        """
+        for i in range(self.count):
+            yield np.load(os.path.join(self.directory, BLOCK_FILE.format(i)),
+                          mmap_mode="r")
+
+    def degrees(self):
+        return np.load(os.path.join(self.directory, DEGREES_FILE),
+                       mmap_mode="r")
+
+
+def shard_corpus(directory, workdir, block_edges=BLOCK_EDGES):
+    """
+    Crawl every HTML file under `directory` and write its links to block
+    files in `workdir`, holding at most `block_edges` links in memory.
+
+    Only the page names and out-degrees are kept for the whole corpus.
+    Returns the EdgeBlocks.
+    """
+    pages = list(html_files(directory))
+    index = {page: i for i, page in enumerate(pages)}
+    degrees = np.zeros(len(pages), dtype=np.int64)
+
+    count = 0
+    sources = array("i")
+    targets = array("i")
+
+    def flush():
+        nonlocal count
+        block = np.array([np.frombuffer(sources, dtype=np.int32),
+                          np.frombuffer(targets, dtype=np.int32)])
+        np.save(os.path.join(workdir, BLOCK_FILE.format(count)), block)
+        count += 1
+        del sources[:]
+        del targets[:]
+
+    for page, links in stream_pages(directory, pages):
+        source = index[page]
+        for link in links:
+            target = index.get(link)
+            if target is not None:
+                sources.append(source)
+                targets.append(target)
+                degrees[source] += 1
+        if len(sources) >= block_edges:
+            flush()
+    if sources:
+        flush()
+
+    np.save(os.path.join(workdir, DEGREES_FILE), degrees)
+    return EdgeBlocks(workdir, pages, count)
+
+
+def blocked_iteration(blocks, damping_factor, tolerance=TOLERANCE,
+                      max_iterations=MAX_ITERATIONS):
+    """
+    Return the PageRank of every page of EdgeBlocks `blocks` as an array,
+    by the same damped power iteration as solvers.power_iteration.
+
+    Each iteration streams the blocks from disk once, adding every link's
+    share of its source's rank to its target, so only the rank vectors
+    and the block being read need to be in memory.
+    """
+    n = len(blocks.pages)
+    degrees = blocks.degrees()
+    dangling = degrees == 0
+    # Rank each page passes along every one of its links
+    share = np.zeros(n)
+    ranks = np.full(n, 1.0 / n)
+
+    for _ in range(max_iterations):
+        np.divide(ranks, degrees, out=share, where=~dangling)
+        new_ranks = np.zeros(n)
+        for block in blocks:
+            new_ranks += np.bincount(block[1], weights=share[block[0]],
+                                     minlength=n)
+        dangling_mass = ranks[dangling].sum()
+        new_ranks = damping_factor * (new_ranks + dangling_mass / n)
+        new_ranks += (1 - damping_factor) / n
+        residual = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if residual < tolerance:
+            break
+
+    return ranks
+
+
+if __name__ == "__main__":
+    main()
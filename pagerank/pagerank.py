@@ -1,26 +1,109 @@
+import argparse
+import csv
+import heapq
+import operator
 import os
-import random
-import re
 import sys
 
-SS_DELTA = 0.000001  # Steady state threshold
+import numpy as np
+
+from crawler import crawl_graph
+from linkgraph import as_graph, load_graph, teleport_matrix
+from sampling import sample_ranks
+from solvers import METHODS, personalized_iteration, solve, top_indices
+
+SS_DELTA = 0.000001  # Steady state threshold on the total (L1) change in ranks
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Personalizations solved together by personalized_pagerank; memory use
+# is a few times the number of pages times this many floats
+BATCH = 64
+
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print("PageRank Results from Sampling (n = %i)" % (SAMPLES))
-    for page in sorted(ranks):
-        print("  %s: %.4f" % (page, ranks[page]))
-    ranks = iterate_pagerank(corpus, DAMPING)
+    parser = argparse.ArgumentParser(
+        description="Rank the pages of a corpus directory or saved graph."
+    )
+    parser.add_argument("corpus", help="corpus directory or graph file")
+    parser.add_argument("--damping", type=float, default=DAMPING)
+    parser.add_argument("--samples", type=int, default=SAMPLES,
+                        help="pages to sample, or 0 to skip sampling")
+    parser.add_argument("--method", choices=sorted(METHODS),
+                        default="jacobi", help="iteration solver")
+    parser.add_argument("--top", type=int, metavar="K",
+                        help="print only the K highest ranked pages")
+    parser.add_argument("--export", metavar="PATH",
+                        help="write every iterated rank to a .csv or .npy file")
+    args = parser.parse_args()
+    if args.export and not args.export.endswith((".csv", ".npy")):
+        parser.error("--export must be a .csv or .npy file")
+
+    if os.path.isfile(args.corpus):
+        # A graph saved by crawler.py, ranked without parsing any HTML
+        graph = load_graph(args.corpus)
+    else:
+        graph = crawl_graph(args.corpus)
+    if len(graph) == 0:
+        sys.exit("No pages found")
+
+    if args.samples:
+        ranks = sample_ranks(graph, args.damping, args.samples)
+        print("PageRank Results from Sampling (n = %i)" % (args.samples))
+        print_ranks(graph.pages, ranks, args.top)
+
+    result = solve(graph, args.damping, args.method, tolerance=SS_DELTA)
     print("PageRank Results from Iteration")
-    for page in sorted(ranks):
-        print("  %s: %.4f" % (page, ranks[page]))
+    print_ranks(graph.pages, result.ranks, args.top)
+    print("%s: %i iterations, residual %.2e, %.3f seconds" % (
+        result.method, result.iterations,
+        result.residuals[-1] if result.residuals else 0.0, result.seconds
+    ))
+
+    if args.export:
+        try:
+            export_ranks(graph.pages, result.ranks, args.export)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Could not export ranks: {e}")
+
+
+def print_ranks(pages, ranks, top=None):
+    """
+    Print every page's rank in order of page name, or only the `top`
+    highest ranked pages, highest first.
+    """
+    if top is None:
+        order = sorted(range(len(pages)), key=pages.__getitem__)
+    else:
+        order = top_indices(ranks, top)
+    for i in order:
+        print("  %s: %.4f" % (pages[i], ranks[i]))
+
+
+def top_pages(ranks, k):
+    """
+    Return the `k` pages with the highest PageRank values in `ranks`, a
+    dictionary as returned by iterate_pagerank, as a list of
+    (page, rank) pairs, highest first.
+    """
+    return heapq.nlargest(k, ranks.items(), key=operator.itemgetter(1))
+
+
+def export_ranks(pages, ranks, path):
+    """
+    Write the rank of every page to `path`, as "page,rank" rows if it
+    ends in .csv, or as a NumPy array in page order if it ends in .npy.
+    """
+    if path.endswith(".npy"):
+        np.save(path, np.asarray(ranks, dtype=np.float64))
+    elif path.endswith(".csv"):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["page", "rank"])
+            writer.writerows(zip(pages, np.asarray(ranks).tolist()))
+    else:
+        raise ValueError(f"{path} is not a .csv or .npy file")
 
 
 def crawl(directory):
@@ -28,26 +111,13 @@ def crawl(directory):
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
-    """
-    pages = dict()
-
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
-
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
 
-    return pages
+    Pages in subdirectories are included, named by their path relative
+    to `directory`, with links resolved relative to the linking page.
+    """
+    # Parse files across a thread pool, reading each in bounded chunks,
+    # and keep only links to other pages in the corpus
+    return crawl_graph(directory).corpus()
 
 
 def transition_model(corpus, page, damping_factor):
@@ -88,7 +158,7 @@ def transition_model(corpus, page, damping_factor):
     return pd
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, seed=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
@@ -96,34 +166,22 @@ def sample_pagerank(corpus, damping_factor, n):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    `corpus` may also be a LinkGraph, such as one loaded by load_graph.
     """
     if len(corpus) == 0:
         return
 
-    # The return value of the function should be a Python dictionary with one key for each page in the corpus.
-    # Each key should be mapped to a value representing that page’s estimated PageRank (i.e., the proportion of all
-    # the samples that corresponded to that page). The values in this dictionary should sum to 1.
-    default_prob = 0
-    pr = dict.fromkeys(corpus.keys(), default_prob)
-    # The first sample should be generated by choosing from a page at random.
-    page = random.choices(list(corpus.keys()), weights=None, cum_weights=None, k=1)[0]
-    # For each of the remaining samples, the next sample should be generated from the previous
-    # sample based on the previous sample’s transition model.
-    for i in range(n):  # You may assume that n will be at least 1.
-        old_pr = transition_model(corpus, page, damping_factor)
-        pr[page] += 1
-        # You will likely want to pass the previous sample into your transition_model function, along with the
-        # corpus and the damping_factor, to get the probabilities for the next sample.
-        page = random.choices(list(old_pr.keys()), weights=list(old_pr.values()), cum_weights=None, k=1)[0]
-
-    # Normalize the output
-    for key in pr:
-        pr[key] /= n
-
-    return pr
-
-
-def iterate_pagerank(corpus, damping_factor):
+    # Follow the same transition model as transition_model, but for many
+    # surfers at once over the compiled link arrays, so each sample costs
+    # a constant amount of work instead of building a distribution over
+    # the whole corpus. `seed` makes the samples reproducible.
+    graph = as_graph(corpus)
+    ranks = sample_ranks(graph, damping_factor, n, seed=seed)
+    return dict(zip(graph.pages, ranks.tolist()))
+
+
+def iterate_pagerank(corpus, damping_factor, method="jacobi"):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -131,64 +189,49 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    `corpus` may also be a LinkGraph, such as one loaded by load_graph.
+    `method` selects the solver, one of solvers.METHODS: "jacobi",
+    "gauss-seidel", "aitken" or "adaptive".
     """
     if len(corpus) == 0:
         return
 
-    # The return value of the function should be a Python dictionary with one key for each page in the corpus.
-    # Each key should be mapped to a value representing that page’s PageRank. The values in this dictionary should
-    # sum to 1.
-    num_pages = len(corpus)
+    # Compile the corpus into a sparse link matrix once, then iterate
+    # with one matrix-vector product per step instead of rescanning the
+    # corpus for every page. A page that has no links at all is
+    # interpreted as having one link for every page in the corpus
+    # (including itself).
+    graph = as_graph(corpus)
+    result = solve(graph, damping_factor, method, tolerance=SS_DELTA)
+    return dict(zip(graph.pages, result.ranks.tolist()))
 
-    # Move this logic here to ensure it is applied beforehand.
-    # A page that has no links at all should be interpreted as having one link for every page in the corpus
-    #  (including itself).
-    for key, value in corpus.items():
-        if len(value) == 0:
-            corpus[key] = list(corpus.keys())
-
-    # The function should begin by assigning each page a rank of 1 / N, where N is the total number of
-    # pages in the corpus.
-    default_prob = 1.0 / num_pages
-    pr = dict.fromkeys(corpus.keys(), default_prob)
-
-    stop_flag = False
-
-    while not stop_flag:
-        old_pr = pr.copy()
-        # The function should then repeatedly calculate new rank values based on all of the current rank values,
-        # according to the PageRank formula in the “Background” section. (i.e., calculating a page’s PageRank based
-        # on the PageRanks of all pages that link to it).
-        for key in corpus:
-            pr[key] = ((1 - damping_factor)/num_pages) + (damping_factor * sum_term(corpus, damping_factor, pr, key))
-            delta = abs(old_pr[key] - pr[key])
-            # This process should repeat until no PageRank value changes by more than 0.001 between the current
-            # rank values and the new rank values.
-            # Print a simple key so that can plot and find the required SS_DELTA for steady state
-            # (SS seems occur at approximately 22 iterations for Corpus 2)
-            # debug if key == "programming.html":
-            # debug   print(pr[key])
-            if delta <= SS_DELTA:
-                stop_flag = True
-
-    return pr
-
-
-def sum_term(corpus, damping_factor, pr, page):
-    # Easier to move to separate function because of recursivity
-    sum_term_output = 0
-
-    for key, value in corpus.items():
-        # Moved to top of iterative logic
-        # A page that has no links at all should be interpreted as having one link for every page in the corpus
-        #  (including itself).
-        # if not value:
-        #    value = corpus.keys()
-        if page in corpus[key]:
-            # sum_term_output += (1 - damping_factor) / len(corpus) + damping_factor * (pr[key] / len(value))
-            sum_term_output += pr[key] / len(value)
-
-    return sum_term_output
+
+def personalized_pagerank(corpus, damping_factor, personalizations):
+    """
+    Return personalized PageRank values for each of `personalizations`,
+    where the random surfer teleports only to the pages it favours.
+
+    Each personalization is a collection of pages, teleported to with
+    equal probability, or a dictionary mapping pages to weights. Return
+    a list with one dictionary of PageRank values per personalization,
+    in the same order.
+    """
+    if len(corpus) == 0:
+        return [dict() for _ in personalizations]
+
+    # Solve BATCH personalizations at a time as the columns of a matrix,
+    # so each step of the iteration is one sparse product for all of them
+    graph = as_graph(corpus)
+    pages = list(graph.pages)
+    results = []
+    for start in range(0, len(personalizations), BATCH):
+        teleport = teleport_matrix(graph, personalizations[start:start + BATCH])
+        ranks = personalized_iteration(graph, damping_factor, teleport,
+                                       tolerance=SS_DELTA)
+        for column in ranks.T:
+            results.append(dict(zip(pages, column.tolist())))
+    return results
 
 
 if __name__ == "__main__":
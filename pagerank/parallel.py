@@ -0,0 +1,145 @@
+import os
+import sys
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import scipy.sparse
+
+from crawler import crawl_graph
+from linkgraph import load_graph
+from solvers import MAX_ITERATIONS, TOLERANCE
+
+# Rows of the link matrix, and the rank vectors, mapped from shared
+# memory in each worker process, and the blocks they live in, which must
+# stay open while they are in use
+worker_arrays = {}
+worker_blocks = []
+
+# Row shards of the link matrix built by each worker, by (start, end)
+worker_shards = {}
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python parallel.py (corpus | graph) [processes]")
+    if os.path.isfile(sys.argv[1]):
+        graph = load_graph(sys.argv[1])
+    else:
+        graph = crawl_graph(sys.argv[1])
+    processes = int(sys.argv[2]) if len(sys.argv) == 3 else None
+    ranks = parallel_iteration(graph, 0.85, processes)
+    print("PageRank Results from Parallel Iteration")
+    for page, rank in zip(graph.pages, ranks.tolist()):
+        print("  %s: %.4f" % (page, rank))
+
+
+def parallel_iteration(graph, damping_factor, processes=None,
+                       tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Return the PageRank of every page of LinkGraph `graph` as an array,
+    by the same damped power iteration as solvers.power_iteration, with
+    the matrix-vector product of every iteration split across a pool of
+    `processes` workers (default: one per core).
+
+    The link matrix is split into one shard of rows per worker, with
+    about the same number of links each. Workers read the matrix and the
+    current ranks from shared memory and write the new ranks of their
+    rows straight into a shared result vector, so an iteration only
+    sends the shard bounds to each worker.
+    """
+    processes = processes or os.cpu_count() or 1
+    n = len(graph)
+    matrix = graph.transition_matrix()
+    dangling = graph.dangling()
+
+    # Shard boundaries at equal numbers of links
+    cuts = np.searchsorted(
+        matrix.indptr, np.linspace(0, matrix.nnz, processes + 1)
+    )
+    cuts[0], cuts[-1] = 0, n
+    shards = [(int(start), int(end)) for start, end in zip(cuts, cuts[1:])
+              if end > start]
+
+    values = {
+        "indptr": matrix.indptr,
+        "indices": matrix.indices,
+        "data": matrix.data,
+        "ranks": np.full(n, 1.0 / n),
+        "product": np.zeros(n),
+    }
+    blocks = {key: share(array) for key, array in values.items()}
+    try:
+        arguments = {key: (block.name, values[key].dtype.str, len(values[key]))
+                     for key, block in blocks.items()}
+        ranks = as_array(blocks["ranks"], *arguments["ranks"][1:])
+        product = as_array(blocks["product"], *arguments["product"][1:])
+        with Pool(processes, initializer=attach,
+                  initargs=(arguments,)) as pool:
+            for _ in range(max_iterations):
+                pool.map(multiply, shards)
+                dangling_mass = ranks[dangling].sum()
+                new_ranks = damping_factor * (product + dangling_mass / n)
+                new_ranks += (1 - damping_factor) / n
+                residual = np.abs(new_ranks - ranks).sum()
+                ranks[:] = new_ranks
+                if residual < tolerance:
+                    break
+        result = ranks.copy()
+        del ranks, product
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+
+    return result
+
+
+def share(values):
+    """
+    Return a new SharedMemory block holding a copy of array `values`.
+    """
+    block = SharedMemory(create=True, size=max(values.nbytes, 1))
+    as_array(block, values.dtype.str, len(values))[:] = values
+    return block
+
+
+def as_array(block, dtype, length):
+    """
+    Return the first `length` items of SharedMemory `block` as an array.
+    """
+    return np.ndarray(length, dtype=dtype, buffer=block.buf)
+
+
+def attach(arguments):
+    """
+    Pool initializer: map the shared arrays described by `arguments`,
+    a dictionary of (block name, dtype, length) by array name.
+    """
+    for key, (name, dtype, length) in arguments.items():
+        block = SharedMemory(name=name)
+        worker_blocks.append(block)
+        worker_arrays[key] = as_array(block, dtype, length)
+
+
+def multiply(shard):
+    """
+    Pool task: write the product of the (start, end) rows of the link
+    matrix with the shared ranks into the same rows of the product.
+    """
+    start, end = shard
+    rows = worker_shards.get(shard)
+    if rows is None:
+        indptr = worker_arrays["indptr"]
+        first, last = indptr[start], indptr[end]
+        rows = worker_shards[shard] = scipy.sparse.csr_matrix(
+            (worker_arrays["data"][first:last],
+             worker_arrays["indices"][first:last],
+             indptr[start:end + 1] - first),
+            shape=(end - start, len(worker_arrays["ranks"])), copy=False
+        )
+    worker_arrays["product"][start:end] = rows @ worker_arrays["ranks"]
+
+
+if __name__ == "__main__":
+    main()
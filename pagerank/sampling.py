@@ -0,0 +1,63 @@
+import numpy as np
+
+# Largest number of random surfers simulated side by side
+SURFERS = 10000
+
+# Steps each surfer takes before its pages are counted, so that where
+# it started stops mattering (its influence shrinks like d ** steps)
+BURN_IN = 50
+
+# Surfer steps recorded between counting passes, bounding memory use
+BATCH = 1 << 20
+
+
+def sample_ranks(graph, damping_factor, n, surfers=None, seed=None):
+    """
+    Return estimated PageRank values for every page of LinkGraph `graph`
+    as an array, from `n` pages visited by random surfers.
+
+    Surfers start on random pages and walk in parallel, each step being
+    a few vectorized array operations for all of them: with probability
+    `damping_factor` a surfer follows one of its page's links, chosen
+    by offset into the CSR arrays, and otherwise (or from a page with no
+    links) jumps to a random page. `seed` makes runs reproducible.
+    """
+    rng = np.random.default_rng(seed)
+    pages = len(graph)
+    offsets = graph.offsets
+    degrees = graph.out_degrees()
+    if surfers is None:
+        surfers = int(min(SURFERS, max(1, n // BURN_IN)))
+
+    positions = rng.integers(pages, size=surfers)
+    for _ in range(BURN_IN):
+        positions = step(positions, offsets, degrees, graph.targets,
+                         damping_factor, rng)
+
+    counts = np.zeros(pages, dtype=np.int64)
+    remaining = n
+    while remaining > 0:
+        steps = max(1, min(remaining, BATCH) // surfers)
+        visited = np.empty((steps, surfers), dtype=np.int64)
+        for i in range(steps):
+            visited[i] = positions
+            positions = step(positions, offsets, degrees, graph.targets,
+                             damping_factor, rng)
+        visited = visited.ravel()[:remaining]
+        counts += np.bincount(visited, minlength=pages)
+        remaining -= len(visited)
+
+    return counts / n
+
+
+def step(positions, offsets, degrees, targets, damping_factor, rng):
+    """
+    Return where surfers at `positions` go next.
+    """
+    out = degrees[positions]
+    follow = (rng.random(len(positions)) < damping_factor) & (out > 0)
+    following = positions[follow]
+    choice = (rng.random(len(following)) * out[follow]).astype(np.int64)
+    next_positions = rng.integers(len(degrees), size=len(positions))
+    next_positions[follow] = targets[offsets[following] + choice]
+    return next_positions
@@ -0,0 +1,344 @@
+import time
+
+import numpy as np
+import scipy.sparse
+from scipy.sparse.linalg import spsolve_triangular
+
+# Stop once the ranks change by less than this in total (L1 norm)
+TOLERANCE = 1e-10
+
+# Give up after this many iterations even if not converged
+MAX_ITERATIONS = 1000
+
+# Iterations between Aitken extrapolations
+EXTRAPOLATE_EVERY = 10
+
+# Aitken extrapolation is only tried while each iteration leaves more
+# than this fraction of the residual; faster convergence means no single
+# slow mode dominates the error, and extrapolating would only disturb it
+SLOW = 0.5
+
+# Pages whose rank changes by less than this fraction of the tolerance
+# per page, for PATIENCE iterations in a row, are frozen by the adaptive
+# solver
+FREEZE = 0.01
+PATIENCE = 3
+
+# The adaptive solver recomputes every page at least this often, and
+# thaws frozen pages whose rank turns out to have moved
+RECHECK = 10
+
+# Frozen pages are only dropped from the product once they are at least
+# this fraction of the pages still computed, since slicing the rows out
+# of the matrix costs about as much as multiplying them
+SLICE = 0.1
+
+
+class Convergence():
+    """
+    Result of solve: the ranks, the method that found them and the
+    tolerance it was given, the L1 residual after each iteration and
+    the time taken.
+    """
+
+    def __init__(self, method, ranks, tolerance, residuals, seconds):
+        self.method = method
+        self.ranks = ranks
+        self.tolerance = tolerance
+        self.residuals = residuals
+        self.seconds = seconds
+
+    @property
+    def iterations(self):
+        return len(self.residuals)
+
+    @property
+    def converged(self):
+        return bool(self.residuals) and self.residuals[-1] < self.tolerance
+
+
+def solve(graph, damping_factor, method="jacobi", tolerance=TOLERANCE,
+          max_iterations=MAX_ITERATIONS, start=None):
+    """
+    Return a Convergence with the PageRank of every page of LinkGraph
+    `graph`, found by `method`, one of the keys of METHODS.
+
+    Every method stops once the L1 norm of the change in the whole rank
+    vector over one iteration falls below `tolerance`.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown method {method}")
+    residuals = []
+    began = time.perf_counter()
+    ranks = METHODS[method](graph, damping_factor, tolerance, max_iterations,
+                            start, residuals)
+    return Convergence(method, ranks, tolerance, residuals,
+                       time.perf_counter() - began)
+
+
+def top_indices(ranks, k):
+    """
+    Return the indices of the `k` largest values of array `ranks`,
+    largest first, partially sorting only as much as needed.
+    """
+    ranks = np.asarray(ranks)
+    k = min(k, len(ranks))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(ranks, len(ranks) - k)[len(ranks) - k:]
+    return top[np.argsort(-ranks[top], kind="stable")]
+
+
+def initial_ranks(n, start):
+    """
+    Return the normalized `start` distribution, or the uniform one.
+    """
+    if start is None:
+        return np.full(n, 1.0 / n)
+    return np.asarray(start, dtype=np.float64) / np.sum(start)
+
+
+def power_iteration(graph, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS, start=None,
+                    residuals=None):
+    """
+    Return the PageRank of every page of LinkGraph `graph` as an array,
+    by damped power iteration from the uniform distribution, or from
+    the distribution `start` if given (such as the ranks of a previous
+    version of the graph, which need far fewer iterations).
+
+    Each iteration computes
+        PR' = d * (M PR + dangling mass / N) + (1 - d) / N
+    with one sparse matrix-vector product, and stops when the L1 norm
+    of PR' - PR falls below `tolerance`. That norm is appended to the
+    list `residuals`, if given, after every iteration.
+    """
+    n = len(graph)
+    matrix = graph.transition_matrix()
+    dangling = graph.dangling()
+    ranks = initial_ranks(n, start)
+
+    for _ in range(max_iterations):
+        dangling_mass = ranks[dangling].sum()
+        new_ranks = damping_factor * (matrix @ ranks + dangling_mass / n)
+        new_ranks += (1 - damping_factor) / n
+        residual = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if residuals is not None:
+            residuals.append(residual)
+        if residual < tolerance:
+            break
+
+    return ranks
+
+
+def gauss_seidel(graph, damping_factor, tolerance, max_iterations, start,
+                 residuals):
+    """
+    Return PageRank values by Gauss-Seidel sweeps, which use the new rank
+    of every page before it in the sweep as soon as it is known.
+
+    Splitting M into its strictly lower and upper triangles L and U, a
+    sweep solves the triangular system
+        (I - d L) PR' = d * (U PR + dangling mass / N) + (1 - d) / N
+    with the dangling mass taken from the previous sweep.
+    """
+    n = len(graph)
+    matrix = graph.transition_matrix()
+    lower = (scipy.sparse.identity(n, format="csr")
+             - damping_factor * scipy.sparse.tril(matrix, -1, format="csr"))
+    upper = damping_factor * scipy.sparse.triu(matrix, 1, format="csr")
+    dangling = graph.dangling()
+    ranks = initial_ranks(n, start)
+
+    for _ in range(max_iterations):
+        dangling_mass = ranks[dangling].sum()
+        right = upper @ ranks
+        right += damping_factor * dangling_mass / n + (1 - damping_factor) / n
+        new_ranks = spsolve_triangular(lower, right, lower=True,
+                                       unit_diagonal=True)
+        new_ranks /= new_ranks.sum()
+        residual = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        residuals.append(residual)
+        if residual < tolerance:
+            break
+
+    return ranks
+
+
+def aitken(graph, damping_factor, tolerance, max_iterations, start,
+           residuals):
+    """
+    Return PageRank values by power iteration, replacing the ranks every
+    EXTRAPOLATE_EVERY iterations with the componentwise Aitken delta-
+    squared extrapolation of the last three iterates, which removes the
+    slowest-decaying error term.
+
+    Extrapolation pays off when the graph has a slow mode, such as sites
+    that mostly link to themselves, and the residual shrinks by less
+    than SLOW per iteration; otherwise plain iteration is kept.
+    """
+    n = len(graph)
+    matrix = graph.transition_matrix()
+    dangling = graph.dangling()
+    ranks = initial_ranks(n, start)
+    history = []
+
+    for iteration in range(max_iterations):
+        dangling_mass = ranks[dangling].sum()
+        new_ranks = damping_factor * (matrix @ ranks + dangling_mass / n)
+        new_ranks += (1 - damping_factor) / n
+        residual = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        residuals.append(residual)
+        if residual < tolerance:
+            break
+
+        history = history[-2:] + [ranks]
+        if (len(history) == 3 and (iteration + 1) % EXTRAPOLATE_EVERY == 0
+                and residual > SLOW * residuals[-2]):
+            ranks = extrapolate(*history)
+            history = []
+
+    return ranks
+
+
+def extrapolate(first, second, third):
+    """
+    Return the componentwise Aitken extrapolation of three successive
+    iterates, keeping the last iterate where it is ill-conditioned.
+    """
+    step = third - second
+    bend = step - (second - first)
+    safe = np.abs(bend) > 1e-15
+    ranks = third.copy()
+    ranks[safe] -= step[safe] ** 2 / bend[safe]
+    if (ranks < 0).any():
+        return third
+    return ranks / ranks.sum()
+
+
+def adaptive(graph, damping_factor, tolerance, max_iterations, start,
+             residuals):
+    """
+    Return PageRank values by power iteration that stops recomputing
+    pages once they have converged.
+
+    A page is frozen once its rank has changed by less than FREEZE times
+    the tolerance divided by the number of pages for PATIENCE iterations
+    in a row, and only the rows of M for the remaining pages are
+    multiplied. A change can pass through zero while the rank is still
+    far from converged, so every RECHECK iterations, and whenever the
+    unfrozen pages alone meet the tolerance, all pages are recomputed
+    and any frozen page that moved is thawed. Only such a full iteration
+    can end the solve, so the result meets the same tolerance as
+    power_iteration.
+
+    This pays off when parts of the graph converge at different rates,
+    as on the web; where every page converges at the same rate nothing
+    is frozen before the last few iterations.
+    """
+    n = len(graph)
+    matrix = graph.transition_matrix()
+    dangling = np.flatnonzero(graph.dangling())
+    ranks = initial_ranks(n, start)
+    threshold = FREEZE * tolerance / n
+    # Every page, as a slice so that full iterations index without copies
+    everyone = slice(None)
+    active = everyone
+    rows = matrix
+    # Iterations in a row each page has stayed under the threshold
+    calm = np.zeros(n, dtype=np.int32)
+    # The pages computed, and their rows, before a full recheck
+    partial = None
+    since = 0
+
+    for _ in range(max_iterations):
+        dangling_mass = ranks[dangling].sum()
+        new_ranks = damping_factor * (rows @ ranks + dangling_mass / n)
+        new_ranks += (1 - damping_factor) / n
+        changes = np.abs(new_ranks - ranks[active])
+        residual = changes.sum()
+        ranks[active] = new_ranks
+        residuals.append(residual)
+        quiet = changes < threshold
+        calm[active] = (calm[active] + 1) * quiet
+
+        if active is everyone:
+            if residual < tolerance:
+                break
+            if partial is not None:
+                # Carry on from the pages computed before the recheck,
+                # plus any frozen page that moved
+                active, rows = partial
+                partial = None
+                moved = calm == 0
+                moved[active] = True
+                if np.count_nonzero(moved) > len(active):
+                    active = np.flatnonzero(moved)
+                    rows = matrix[active]
+        else:
+            since += 1
+            if residual < tolerance or since >= RECHECK:
+                partial = (active, rows)
+                active, rows = everyone, matrix
+                since = 0
+                continue
+
+        # Only quiet pages can have settled, so skip looking while few are
+        if np.count_nonzero(quiet) < SLICE * len(quiet):
+            continue
+        settled = calm[active] >= PATIENCE
+        if np.count_nonzero(settled) >= SLICE * len(settled):
+            if active is everyone:
+                active = np.flatnonzero(~settled)
+            else:
+                active = active[~settled]
+            rows = matrix[active]
+
+    return ranks
+
+
+METHODS = {
+    "jacobi": power_iteration,
+    "gauss-seidel": gauss_seidel,
+    "aitken": aitken,
+    "adaptive": adaptive,
+}
+
+
+def personalized_iteration(graph, damping_factor, teleport,
+                           tolerance=TOLERANCE,
+                           max_iterations=MAX_ITERATIONS):
+    """
+    Return the personalized PageRank of every page of LinkGraph `graph`
+    for each column of the N x B array `teleport`, as an N x B array.
+
+    The surfer teleports according to its column of `teleport` instead
+    of uniformly, and so does it from a page with no links. All columns
+    are iterated together, one sparse matrix times dense matrix product
+    per step,
+        PR' = d * (M PR + teleport * dangling mass) + (1 - d) * teleport
+    and a column stops being updated once its L1 change falls below
+    `tolerance`.
+    """
+    matrix = graph.transition_matrix()
+    dangling = graph.dangling()
+    teleport = np.asarray(teleport, dtype=np.float64)
+    ranks = teleport.copy()
+    active = np.arange(teleport.shape[1])
+
+    for _ in range(max_iterations):
+        if not len(active):
+            break
+        current = ranks[:, active]
+        jump = teleport[:, active]
+        dangling_mass = current[dangling].sum(axis=0)
+        new_ranks = damping_factor * (matrix @ current + jump * dangling_mass)
+        new_ranks += (1 - damping_factor) * jump
+        residuals = np.abs(new_ranks - current).sum(axis=0)
+        ranks[:, active] = new_ranks
+        active = active[residuals >= tolerance]
+
+    return ranks